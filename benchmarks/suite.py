@@ -0,0 +1,311 @@
+"""Benchmark suite of the PyVISA-proxy RPC path with the @sim backend.
+
+Run ``python benchmarks/suite.py`` in order to measure the current tree and
+compare it against ``benchmarks/baseline.json``. The run fails if a result is
+worse than the baseline by more than the threshold. Record a new baseline on
+the reference machine with ``--save``.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing
+
+import pyvisa
+
+from pyvisa_proxy import ProxyServer
+from pyvisa_proxy.highlevel import SYNC_TIMEOUT, request_sync_reply
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESOURCE = "TCPIP0::localhost::inst0::INSTR"
+PAYLOAD_SIZES = (16, 1024, 65536)
+CLIENTS = (1, 10, 100)
+
+INSTRUMENTS = """spec: "1.0"
+devices:
+  bench:
+    eom:
+      TCPIP INSTR:
+        q: "\\r\\n"
+        r: "\\n"
+    dialogues:
+      - q: "?IDN"
+        r: "BENCH"
+{payloads}
+resources:
+  {resource}:
+    device: bench
+"""
+
+
+def free_port() -> int:
+    """Find a free port by temporarily opening a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def write_instruments(directory: str) -> str:
+    """Write a pyvisa-sim definition with payloads of different sizes."""
+    payloads = "\n".join(
+        f'      - q: "?DATA{size}"\n        r: "{"x" * size}"'
+        for size in PAYLOAD_SIZES
+    )
+    path = os.path.join(directory, "instruments.yaml")
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write(INSTRUMENTS.format(payloads=payloads, resource=RESOURCE))
+    return path
+
+
+def result(
+    name: str, value: float, unit: str, higher_is_better: bool
+) -> typing.Dict[str, typing.Any]:
+    """Create a benchmark result."""
+    return {
+        "name": name,
+        "value": value,
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+def bench_latency(library_path: str, calls: int):
+    """Measure the median round-trip latency of a query."""
+    rm = pyvisa.ResourceManager(library_path)
+    inst = rm.open_resource(RESOURCE)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        inst.query("?IDN")
+        samples.append(time.perf_counter() - start)
+    inst.close()
+    rm.close()
+    yield result("query_latency", statistics.median(samples), "s", False)
+
+
+def bench_throughput(library_path: str, duration: float):
+    """Measure the query throughput of concurrent clients."""
+    for clients in CLIENTS:
+        counts = [0] * clients
+        ready = threading.Barrier(clients + 1)
+        stop = threading.Event()
+
+        # PyVISA shares the resource manager of a library path, so that it
+        # must not be closed by the client threads.
+        rm = pyvisa.ResourceManager(library_path)
+
+        def client(index: int):
+            inst = rm.open_resource(RESOURCE)
+            ready.wait()
+            while not stop.is_set():
+                inst.query("?IDN")
+                counts[index] += 1
+            inst.close()
+
+        threads = [
+            threading.Thread(target=client, args=(index,))
+            for index in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        start = time.perf_counter()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        rm.close()
+        yield result(
+            f"query_throughput_{clients}_clients",
+            sum(counts) / elapsed,
+            "1/s",
+            True,
+        )
+
+
+def bench_read_raw(library_path: str, calls: int):
+    """Measure the read_raw throughput by payload size."""
+    rm = pyvisa.ResourceManager(library_path)
+    inst = rm.open_resource(RESOURCE)
+    for size in PAYLOAD_SIZES:
+        start = time.perf_counter()
+        for _ in range(calls):
+            inst.write(f"?DATA{size}")
+            inst.read_raw()
+        elapsed = time.perf_counter() - start
+        yield result(
+            f"read_raw_throughput_{size}_bytes",
+            calls * size / elapsed,
+            "B/s",
+            True,
+        )
+    inst.close()
+    rm.close()
+
+
+def bench_resources(library_path: str, calls: int):
+    """Measure the cost of open_resource and list_resources."""
+    rm = pyvisa.ResourceManager(library_path)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        inst = rm.open_resource(RESOURCE)
+        samples.append(time.perf_counter() - start)
+        inst.close()
+    yield result("open_resource", statistics.median(samples), "s", False)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        rm.list_resources()
+        samples.append(time.perf_counter() - start)
+    yield result("list_resources", statistics.median(samples), "s", False)
+    rm.close()
+
+
+def bench_handshake(port: int, calls: int):
+    """Measure the cost of the synchronization with the server.
+
+    PyVISA reuses the library of a resource manager, so that the handshake
+    is measured directly.
+    """
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        request_sync_reply("localhost", port, SYNC_TIMEOUT)
+        samples.append(time.perf_counter() - start)
+    yield result("handshake", statistics.median(samples), "s", False)
+
+
+def bench_import(calls: int):
+    """Measure the import time of the client and server in fresh interpreters.
+
+    Short-lived test workers pay the client import time on every start.
+    """
+    for name, statement in (
+        ("import_client", "import pyvisa_proxy"),
+        ("import_server", "from pyvisa_proxy import ProxyServer"),
+    ):
+        samples = []
+        for _ in range(calls):
+            code = (
+                "import time; start = time.perf_counter(); "
+                f"{statement}; print(time.perf_counter() - start)"
+            )
+            output = subprocess.run(
+                [sys.executable, "-c", code],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            samples.append(float(output))
+        yield result(name, statistics.median(samples), "s", False)
+
+
+def run(calls: int, duration: float) -> typing.List[typing.Dict]:
+    """Run all benchmarks against a local server."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        backend = f"{write_instruments(directory)}@sim"
+        server = ProxyServer(port, backend=backend, ipc=False)
+        server.start()
+        library_path = f"localhost:{port}@proxy"
+        try:
+            results = []
+            for bench in (
+                lambda: bench_latency(library_path, calls),
+                lambda: bench_throughput(library_path, duration),
+                lambda: bench_read_raw(library_path, calls // 10),
+                lambda: bench_resources(library_path, calls // 10),
+                lambda: bench_handshake(port, calls // 10),
+                lambda: bench_import(max(1, calls // 100)),
+            ):
+                for entry in bench():
+                    print(
+                        f"{entry['name']:<36}{entry['value']:>16.6g} "
+                        f"{entry['unit']}"
+                    )
+                    results.append(entry)
+            return results
+        finally:
+            server.close()
+
+
+def compare(
+    results: typing.List[typing.Dict],
+    baseline: typing.List[typing.Dict],
+    threshold: float,
+) -> typing.List[str]:
+    """List the results which regressed by more than the threshold."""
+    reference = {entry["name"]: entry["value"] for entry in baseline}
+    regressions = []
+    for entry in results:
+        expected = reference.get(entry["name"])
+        if not expected:
+            continue
+        if entry["higher_is_better"]:
+            change = (expected - entry["value"]) / expected
+        else:
+            change = (entry["value"] - expected) / expected
+        if change > threshold:
+            regressions.append(
+                f"{entry['name']}: {entry['value']:.6g} {entry['unit']} is "
+                f"{change:.0%} worse than baseline {expected:.6g}"
+            )
+    return regressions
+
+
+def main() -> int:
+    """Run benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--output", help="write results as JSON file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="tolerated relative regression, defaults to 0.25",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="store results as baseline"
+    )
+    args = parser.parse_args()
+    results = run(args.calls, args.duration)
+    report = {
+        "python": sys.version.split()[0],
+        "pyvisa": pyvisa.__version__,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=4)
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=4)
+            fp.write("\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save first.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as fp:
+        baseline = json.load(fp)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compare the round-trip latency of the PyVISA-proxy transports.
+
+Run with ``python benchmarks/transports.py [--calls N]``. Each transport is
+measured with a query of the first simulated ``@sim`` instrument.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import socket
+import statistics
+import time
+import typing
+
+import pyvisa
+
+from pyvisa_proxy import ProxyServer
+from pyvisa_proxy.highlevel import clear_sync_cache
+
+
+def free_port() -> int:
+    """Find a free port by temporarily opening a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def measure(library_path: str, calls: int) -> typing.List[float]:
+    """Measure the round-trip time of queries in microseconds."""
+    rm = pyvisa.ResourceManager(f"{library_path}@proxy")
+    try:
+        inst = rm.open_resource(rm.list_resources()[0])
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            inst.query("?IDN")
+            samples.append((time.perf_counter() - start) * 1e6)
+        inst.close()
+        return samples
+    finally:
+        rm.close()
+
+
+def run_server(server: ProxyServer, library_path: str, calls: int):
+    """Run server in the background and measure a transport."""
+    server.start()
+    try:
+        clear_sync_cache()
+        return measure(library_path, calls)
+    finally:
+        server.close()
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    port = free_port()
+    results = {
+        "tcp": run_server(
+            ProxyServer(port, backend="@sim", ipc=False),
+            f"localhost:{port}",
+            args.calls,
+        ),
+        "ipc": run_server(
+            ProxyServer(port, backend="@sim"), f"localhost:{port}", args.calls
+        ),
+        "inproc": run_server(
+            ProxyServer(0, backend="@sim", inproc="bench"),
+            "inproc:bench",
+            args.calls,
+        ),
+    }
+    print(f"{'transport':<10}{'median [us]':>14}{'p99 [us]':>14}")
+    for name, samples in results.items():
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"{name:<10}{statistics.median(samples):>14.1f}{p99:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,39 @@
 :license: MIT, see LICENSE for more details.
 """
 
-from ._main import main as run_server
+import importlib
+import typing
+
 from ._version_handling import get_version
 from .highlevel import ProxyVisaLibrary
-from .proxy_server import ProxyServer
+
+if typing.TYPE_CHECKING:
+    from ._main import main as run_server
+    from .proxy_server import ProxyServer
 
 __version__ = get_version()
 __all__ = ["__version__", "run_server", "ProxyServer"]
 
 WRAPPER_CLASS = ProxyVisaLibrary
+
+# The server modules are imported on first access only, so that loading the
+# @proxy backend on clients does not pull in the server dependencies.
+_LAZY_ATTRIBUTES = {
+    "run_server": ("._main", "main"),
+    "ProxyServer": (".proxy_server", "ProxyServer"),
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    """Import server attributes on first access."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    """List module attributes including the lazy ones."""
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
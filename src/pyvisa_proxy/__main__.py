@@ -14,4 +14,19 @@ if __name__ == "__main__":
         level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s"
     )
     args = parse_arguments(sys.argv[1:])
-    main(args.port, args.rpc_port, args.backend)
+    main(
+        args.port,
+        args.rpc_port,
+        args.backend,
+        execute_allowlist=args.execute_allowlist,
+        execute_timeout=args.execute_timeout,
+        max_jobs=args.max_jobs,
+        job_result_ttl=args.job_result_ttl,
+        single_port=args.single_port,
+        ipc=args.ipc,
+        metrics_port=args.metrics_port,
+        admin_token=args.admin_token,
+        slow_threshold=args.slow_threshold,
+        slow_resource_thresholds=dict(args.slow_resource_thresholds),
+        slow_log_rate=args.slow_log_rate,
+    )
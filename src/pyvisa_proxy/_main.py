@@ -15,9 +15,14 @@ from .proxy_server import ProxyServer
 LOGGER = logging.getLogger(__name__)
 
 
-def main(port: int, rpc_port: typing.Optional[int] = None, backend: str = ""):
+def main(
+    port: int,
+    rpc_port: typing.Optional[int] = None,
+    backend: str = "",
+    **kwargs,
+):
     """Run a PyVISA proxy server."""
-    server = ProxyServer(port, rpc_port, backend)
+    server = ProxyServer(port, rpc_port, backend, **kwargs)
     close_ref = WeakMethod(server.close)
 
     def call_close():
@@ -30,6 +35,16 @@ def main(port: int, rpc_port: typing.Optional[int] = None, backend: str = ""):
     LOGGER.info("Server is shutting down.")
 
 
+def _resource_threshold(value: str) -> typing.Tuple[str, float]:
+    """Parse a slow request threshold like ``TCPIP*::INSTR=0.5``."""
+    pattern, separator, seconds = value.rpartition("=")
+    if not separator or not pattern:
+        raise argparse.ArgumentTypeError(
+            f"{value} is not of the form PATTERN=SECONDS"
+        )
+    return pattern, float(seconds)
+
+
 def parse_arguments(argv):
     """Parse CLI arguments."""
     parser = argparse.ArgumentParser()
@@ -47,12 +62,94 @@ def parse_arguments(argv):
         default=None,
         help="Custom RPC Port for zmq localhost binding",
     )
+    parser.add_argument(
+        "--single-port",
+        dest="single_port",
+        action="store_true",
+        help="Serve synchronization and RPC on --port",
+    )
+    parser.add_argument(
+        "--no-ipc",
+        dest="ipc",
+        action="store_false",
+        help="Do not bind an ipc:// endpoint for clients on the same node",
+    )
     parser.add_argument(
         "--backend",
         type=str,
         dest="backend",
         default="",
-        help="Backend for pyvisa ResourceManager",
+        help="Backend for pyvisa ResourceManager. Several backends are "
+        "separated by commas and may be preceded by resource name patterns, "
+        "e.g. ASRL*|USB*=@py,GPIB*=@ivi",
+    )
+    parser.add_argument(
+        "--allow-execute",
+        type=str,
+        dest="execute_allowlist",
+        action="append",
+        default=[],
+        metavar="ADDRESS_PATTERN",
+        help="Allow clients whose IP address matches the pattern to execute "
+        "shipped callables at server side",
+    )
+    parser.add_argument(
+        "--execute-timeout",
+        type=float,
+        dest="execute_timeout",
+        default=60.0,
+        help="Timeout in seconds for shipped callables",
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        dest="max_jobs",
+        default=None,
+        help="Maximum number of running jobs",
+    )
+    parser.add_argument(
+        "--job-ttl",
+        type=float,
+        dest="job_result_ttl",
+        default=600.0,
+        help="Seconds to keep results of finished jobs",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        dest="metrics_port",
+        default=None,
+        help="Local port which serves metrics in the Prometheus text format",
+    )
+    parser.add_argument(
+        "--admin-token",
+        type=str,
+        dest="admin_token",
+        default=None,
+        help="Token which permits remote clients to profile the server",
+    )
+    parser.add_argument(
+        "--slow-threshold",
+        type=float,
+        dest="slow_threshold",
+        default=None,
+        help="Log requests which take longer than this number of seconds",
+    )
+    parser.add_argument(
+        "--slow-resource",
+        type=_resource_threshold,
+        dest="slow_resource_thresholds",
+        action="append",
+        default=[],
+        metavar="PATTERN=SECONDS",
+        help="Slow request threshold for resources matching the pattern",
+    )
+    parser.add_argument(
+        "--slow-log-rate",
+        type=float,
+        dest="slow_log_rate",
+        default=60.0,
+        help="Maximum number of slow request log entries per minute",
     )
     args = parser.parse_args(argv)
     return args
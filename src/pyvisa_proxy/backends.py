@@ -0,0 +1,165 @@
+"""Hosting of several PyVISA backends by one PyVISA-proxy server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+import fnmatch
+import logging
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+import pyvisa
+
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_backends(
+    spec: str,
+) -> typing.List[typing.Tuple[str, typing.List[str]]]:
+    """Parse a backend specification like ``ASRL*|USB*=@py,GPIB*=@ivi``.
+
+    Backends are separated by commas. Each backend may be preceded by
+    resource name patterns, separated by ``|``, which are routed to it.
+
+    :param spec: backend specification
+    :type spec: str
+    :raises ValueError: if a backend is given twice
+    :return: backend libraries with their resource name patterns
+    :rtype: typing.List[typing.Tuple[str, typing.List[str]]]
+    """
+    backends: typing.List[typing.Tuple[str, typing.List[str]]] = []
+    for item in spec.split(",") if spec else [""]:
+        patterns, separator, library = item.strip().rpartition("=")
+        if library in (backend for backend, _ in backends):
+            raise ValueError(f"Backend {library!r} is given twice.")
+        backends.append(
+            (library, patterns.split("|") if separator and patterns else [])
+        )
+    return backends
+
+
+class Backend(object):
+    """A PyVISA backend with its own resource manager and executor.
+
+    A hung driver call only blocks the executor threads of its backend.
+    """
+
+    def __init__(
+        self,
+        library: str,
+        patterns: typing.Sequence[str] = (),
+        max_workers: typing.Optional[int] = None,
+    ):
+        """Initialize backend.
+
+        :param library: PyVISA backend, e.g. ``@py``
+        :type library: str
+        :param patterns: resource name patterns which are routed to the
+            backend, defaults to ()
+        :type patterns: typing.Sequence[str]
+        :param max_workers: number of executor threads, defaults to None
+        :type max_workers: typing.Optional[int]
+        """
+        self.library = library
+        self.patterns = [pattern.upper() for pattern in patterns]
+        self.rm = pyvisa.ResourceManager(library)
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=f"pyvisa-proxy{library or '@ivi'}"
+        )
+
+    def matches(self, resource_name: str) -> bool:
+        """Check whether a resource name is routed to the backend."""
+        name = resource_name.upper()
+        return any(
+            fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns
+        )
+
+    def close(self):
+        """Stop the executor threads."""
+        self.executor.shutdown(wait=False)
+
+
+class BackendRouter(object):
+    """Route resources to the backends of a server.
+
+    A resource is opened by the backend which is selected explicitly, else
+    by the first backend with a matching resource name pattern, else by the
+    backend which listed it and else by the first backend.
+    """
+
+    def __init__(self, spec: str):
+        """Initialize router.
+
+        :param spec: backend specification, see :func:`parse_backends`
+        :type spec: str
+        """
+        self.backends: typing.Dict[str, Backend] = {}
+        for library, patterns in parse_backends(spec):
+            self.backends[library] = Backend(library, patterns)
+        self.default = next(iter(self.backends.values()))
+        self._listed: typing.Dict[str, Backend] = {}
+
+    def select(
+        self, resource_name: str, backend: typing.Optional[str] = None
+    ) -> Backend:
+        """Select the backend which opens a resource.
+
+        :param resource_name: resource name
+        :type resource_name: str
+        :param backend: explicitly selected backend, defaults to None
+        :type backend: typing.Optional[str]
+        :raises ValueError: if the selected backend is not hosted
+        :return: backend
+        :rtype: Backend
+        """
+        if backend is not None:
+            if backend not in self.backends:
+                raise ValueError(
+                    f"Backend {backend!r} is not hosted, use one of "
+                    f"{list(self.backends)}."
+                )
+            return self.backends[backend]
+        for candidate in self.backends.values():
+            if candidate.matches(resource_name):
+                return candidate
+        return self._listed.get(resource_name.upper(), self.default)
+
+    async def list_resources(self, *args, **kwargs) -> typing.Tuple[str, ...]:
+        """List and merge the resources of all backends concurrently.
+
+        Failing backends are skipped unless all of them fail.
+        """
+        loop = asyncio.get_running_loop()
+        backends = list(self.backends.values())
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    backend.executor,
+                    lambda rm=backend.rm: rm.list_resources(*args, **kwargs),
+                )
+                for backend in backends
+            ),
+            return_exceptions=True,
+        )
+        if all(isinstance(result, BaseException) for result in results):
+            raise typing.cast(BaseException, results[0])
+        resources: typing.Dict[str, None] = {}
+        for backend, result in zip(backends, results):
+            if isinstance(result, BaseException):
+                LOGGER.warning(
+                    "Listing resources of backend %r failed: %s",
+                    backend.library,
+                    result,
+                )
+                continue
+            for name in result:
+                self._listed.setdefault(name.upper(), backend)
+                resources.setdefault(name)
+        return tuple(resources)
+
+    def close(self):
+        """Stop the executor threads of all backends."""
+        for backend in self.backends.values():
+            backend.close()
@@ -0,0 +1,314 @@
+"""Load generator for PyVISA-proxy servers.
+
+Run ``python -m pyvisa_proxy.bench --target host:port`` in order to put load
+on a proxy node, or ``python -m pyvisa_proxy.bench --local`` for an offline
+run against an embedded ``@sim`` server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import socket
+import sys
+import threading
+import time
+import typing
+
+import pyvisa
+from pyvisa.resources import MessageBasedResource
+
+from .proxy_server import ProxyServer
+
+OPERATIONS = ("query", "write", "read_raw", "attribute")
+
+#: Samples of a worker as (operation, latency in seconds, failed)
+Samples = typing.List[typing.Tuple[str, float, bool]]
+
+
+def parse_mix(mix: str) -> typing.Dict[str, float]:
+    """Parse an operation mix like ``query=8,write=1,read_raw=1``.
+
+    :raises ValueError: if an operation is unknown or no weight is positive
+    """
+    weights = {}
+    for item in mix.split(","):
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(
+                f"Unknown operation {operation}, use one of {OPERATIONS}."
+            )
+        weights[operation] = float(weight or 1)
+    if sum(weights.values()) <= 0:
+        raise ValueError("At least one operation needs a positive weight.")
+    return weights
+
+
+def _operation(
+    inst: MessageBasedResource, operation: str, command: str, attribute: str
+):
+    """Perform a single operation."""
+    if operation == "query":
+        inst.query(command)
+    elif operation == "write":
+        inst.write(command)
+    elif operation == "read_raw":
+        inst.write(command)
+        inst.read_raw()
+    else:
+        getattr(inst, attribute)
+
+
+def run_worker(
+    rm: pyvisa.ResourceManager,
+    resource: str,
+    mix: typing.Dict[str, float],
+    rate: float,
+    duration: float,
+    command: str,
+    attribute: str,
+    seed: int = 0,
+) -> typing.Tuple[Samples, float]:
+    """Run operations of the mix for a duration and measure their latency.
+
+    :param rate: target operations per second, 0 for as fast as possible
+    :type rate: float
+    :return: samples and the elapsed seconds
+    :rtype: typing.Tuple[Samples, float]
+    """
+    rng = random.Random(seed)
+    operations, weights = zip(*mix.items())
+    samples: Samples = []
+    inst = typing.cast(MessageBasedResource, rm.open_resource(resource))
+    try:
+        start = time.perf_counter()
+        deadline = start + duration
+        count = 0
+        while True:
+            if rate > 0:
+                delay = start + count / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            operation = rng.choices(operations, weights)[0]
+            failed = False
+            try:
+                _operation(inst, operation, command, attribute)
+            except Exception:
+                failed = True
+            samples.append((operation, time.perf_counter() - now, failed))
+            count += 1
+    finally:
+        inst.close()
+    return samples, time.perf_counter() - start
+
+
+def _process_worker(library_path: str, *args) -> typing.Tuple[Samples, float]:
+    """Run a worker with its own resource manager in a child process."""
+    rm = pyvisa.ResourceManager(library_path)
+    try:
+        return run_worker(rm, *args)
+    finally:
+        rm.close()
+
+
+def percentile(values: typing.Sequence[float], fraction: float) -> float:
+    """Get a percentile of sorted values by the nearest rank."""
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, int(len(values) * fraction + 0.5) - 1))
+    return values[index]
+
+
+def summarize(
+    samples: Samples, elapsed: float
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Summarize throughput, latency percentiles and error rate by operation.
+
+    The entry ``total`` summarizes all operations.
+    """
+    groups: typing.Dict[str, typing.List[typing.Tuple[float, bool]]] = {}
+    for operation, latency, failed in samples:
+        groups.setdefault(operation, []).append((latency, failed))
+        groups.setdefault("total", []).append((latency, failed))
+    report = {}
+    for operation, group in sorted(groups.items()):
+        latencies = sorted(latency for latency, _ in group)
+        errors = sum(1 for _, failed in group if failed)
+        report[operation] = {
+            "count": len(group),
+            "throughput": len(group) / elapsed,
+            "error_rate": errors / len(group),
+            "p50": percentile(latencies, 0.5),
+            "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+        }
+    return report
+
+
+def run(args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    """Run the load test which is described by the CLI arguments."""
+    server = None
+    library_path = args.target
+    if args.local:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("localhost", 0))
+            port = s.getsockname()[1]
+        server = ProxyServer(port, backend=args.backend)
+        server.start()
+        library_path = f"localhost:{port}"
+    command = args.command or ("?IDN" if args.local else "*IDN?")
+    rm = pyvisa.ResourceManager(f"{library_path}@proxy")
+    try:
+        resource = args.resource or rm.list_resources()[0]
+        worker_args = (
+            resource,
+            parse_mix(args.mix),
+            args.rate,
+            args.duration,
+            command,
+            args.attribute,
+        )
+        results: typing.List[typing.Tuple[Samples, float]]
+        if args.processes:
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(args.workers) as pool:
+                results = pool.starmap(
+                    _process_worker,
+                    [
+                        (f"{library_path}@proxy",) + worker_args + (seed,)
+                        for seed in range(args.workers)
+                    ],
+                )
+        else:
+            results = [([], 0.0)] * args.workers
+
+            def thread_worker(index: int):
+                results[index] = run_worker(rm, *worker_args, seed=index)
+
+            threads = [
+                threading.Thread(target=thread_worker, args=(index,))
+                for index in range(args.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        samples: Samples = [
+            sample for result in results for sample in result[0]
+        ]
+        # The start-up of worker processes does not count
+        elapsed = max(result[1] for result in results)
+    finally:
+        rm.close()
+        if server is not None:
+            server.close()
+    return {
+        "target": library_path,
+        "resource": resource,
+        "workers": args.workers,
+        "processes": args.processes,
+        "rate": args.rate,
+        "duration": elapsed,
+        "operations": summarize(samples, elapsed),
+    }
+
+
+def print_report(report: typing.Dict[str, typing.Any]):
+    """Print a load test report as table."""
+    print(
+        f"{report['workers']} workers on {report['resource']} at "
+        f"{report['target']} for {report['duration']:.1f} s"
+    )
+    print(
+        f"{'operation':<10}{'count':>9}{'ops/s':>10}{'errors':>8}"
+        f"{'p50 [ms]':>10}{'p90 [ms]':>10}{'p99 [ms]':>10}{'max [ms]':>10}"
+    )
+    for operation, entry in report["operations"].items():
+        print(
+            f"{operation:<10}{entry['count']:>9}{entry['throughput']:>10.1f}"
+            f"{entry['error_rate']:>8.1%}{entry['p50'] * 1e3:>10.2f}"
+            f"{entry['p90'] * 1e3:>10.2f}{entry['p99'] * 1e3:>10.2f}"
+            f"{entry['max'] * 1e3:>10.2f}"
+        )
+
+
+def parse_arguments(argv):
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m pyvisa_proxy.bench",
+        description="Put load on a PyVISA-proxy server.",
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "--target", help="host:port of the server synchronization port"
+    )
+    target.add_argument(
+        "--local",
+        action="store_true",
+        help="run against an embedded server in this process",
+    )
+    parser.add_argument(
+        "--backend",
+        default="@sim",
+        help="backend of the local server, defaults to @sim",
+    )
+    parser.add_argument(
+        "--resource", help="resource name, defaults to the first resource"
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="run the workers as processes instead of threads",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="operations per second and worker, 0 for as fast as possible",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds to run"
+    )
+    parser.add_argument(
+        "--mix",
+        default="query",
+        help="weighted operations, e.g. query=8,write=1,attribute=1",
+    )
+    parser.add_argument(
+        "--command",
+        help="message of query, write and read_raw operations, defaults to "
+        "*IDN? (?IDN for the local server)",
+    )
+    parser.add_argument(
+        "--attribute",
+        default="timeout",
+        help="attribute which is read by attribute operations",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Run load generator."""
+    args = parse_arguments(sys.argv[1:] if argv is None else argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,9 @@
 import logging
 import platform
 import random
+import socket as pysocket
+import threading
+import time
 import typing
 import uuid
 from collections import OrderedDict
@@ -30,6 +33,17 @@ from .rpc_client import RpcClient
 VERSION = get_version()
 LOGGER = logging.getLogger(__name__)
 
+#: Timeout in seconds for the synchronization with a proxy server
+SYNC_TIMEOUT = 2
+#: Seconds for which synchronization replies are reused
+SYNC_CACHE_TTL = 300.0
+
+#: Host name which addresses embedded servers via inproc://
+INPROC_HOST = "inproc"
+
+_SYNC_CACHE: typing.Dict[typing.Tuple[str, str], typing.Tuple] = {}
+_SYNC_CACHE_LOCK = threading.Lock()
+
 
 class CompatibilityError(Exception):
     """Compatibility exception class."""
@@ -37,29 +51,110 @@ class CompatibilityError(Exception):
     pass
 
 
-def sync_up(host: str, sync_port: int, timeout: int):
-    """Synchronize with Proxy server."""
-    ctx = zmq.Context.instance()
+def sync_endpoint(host: str, sync_port: typing.Union[int, str]) -> str:
+    """Get the endpoint of the synchronization channel of a server.
+
+    The host ``inproc`` addresses an embedded server in the same process
+    whose name is given instead of the port.
+    """
+    if host == INPROC_HOST:
+        return f"inproc://pyvisa-proxy.{sync_port}.sync"
+    return f"tcp://{host}:{sync_port}"
+
+
+def rpc_endpoint(host: str, reply: typing.Dict[str, typing.Any]) -> str:
+    """Select the fastest RPC endpoint advertised in a sync reply.
+
+    Embedded servers are addressed via inproc:// and servers on the same
+    node via ipc:// if available, all others via TCP.
+    """
+    if reply.get("rpc_endpoint"):
+        return reply["rpc_endpoint"]
+    if (
+        reply.get("ipc")
+        and reply.get("node") == platform.node()
+        and zmq.has("ipc")
+    ):
+        return reply["ipc"]
+    return f"tcp://{host}:{reply['rpc_port']}"
+
+
+def request_sync_reply(
+    host: str, sync_port: typing.Union[int, str], timeout: float
+) -> typing.Dict[str, typing.Any]:
+    """Request the synchronization reply of a Proxy server."""
+    ctx: zmq.Context = zmq.Context.instance()
     socket = ctx.socket(zmq.REQ)  # pylint: disable=E1101
     socket.identity = f"{platform.node()}.{uuid.uuid4()}".encode()
-    socket.connect(f"tcp://{host}:{sync_port}")
+    socket.connect(sync_endpoint(host, sync_port))
     try:
         socket.send(b"")
-        polled = socket.poll(timeout=timeout * 1000)
+        polled = socket.poll(timeout=int(timeout * 1000))
         if polled == 0:
             raise TimeoutError(
                 "Establishing a connection to PyVISA proxy timed out."
             )
-        reply = pickle.loads(socket.recv())
-        return (
-            reply.get("rpc_port"),
-            reply.get("backend"),
-            reply.get("version"),
-        )
+        return pickle.loads(socket.recv())
     finally:
         socket.close()
 
 
+def sync_up(host: str, sync_port: int, timeout: int):
+    """Synchronize with Proxy server."""
+    reply = request_sync_reply(host, sync_port, timeout)
+    return (
+        reply.get("rpc_port"),
+        reply.get("backend"),
+        reply.get("version"),
+    )
+
+
+def cached_sync_up(
+    host: str,
+    sync_port: typing.Union[int, str],
+    timeout: int = SYNC_TIMEOUT,
+) -> typing.Dict[str, typing.Any]:
+    """Synchronize with Proxy server and reuse replies process-wide.
+
+    Repeated resource managers for the same ``host:port`` skip the handshake
+    for :data:`SYNC_CACHE_TTL` seconds. A cached reply is only used if its
+    RPC port still accepts connections, otherwise it is dropped, e.g. after
+    a server restart with a random RPC port. Embedded servers are not
+    cached.
+    """
+    if host == INPROC_HOST:
+        return request_sync_reply(host, sync_port, timeout)
+    key = (host, str(sync_port))
+    now = time.monotonic()
+    with _SYNC_CACHE_LOCK:
+        entry = _SYNC_CACHE.pop(key, None)
+    if entry is not None and now - entry[0] < SYNC_CACHE_TTL:
+        if _is_reachable(host, entry[1]["rpc_port"], timeout):
+            with _SYNC_CACHE_LOCK:
+                _SYNC_CACHE.setdefault(key, entry)
+            return entry[1]
+        LOGGER.debug("Dropped stale synchronization of %s:%s", *key)
+    reply = request_sync_reply(host, sync_port, timeout)
+    with _SYNC_CACHE_LOCK:
+        _SYNC_CACHE[key] = (now, reply)
+    return reply
+
+
+def _is_reachable(host: str, port: int, timeout: float) -> bool:
+    """Check whether a TCP port accepts connections."""
+    try:
+        with pysocket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def clear_sync_cache():
+    """Forget all cached synchronization replies, e.g. on server restart."""
+    with _SYNC_CACHE_LOCK:
+        _SYNC_CACHE.clear()
+
+
 def check_for_version_compatibility(version):
     """Check for a client and server version compabitility."""
     resource_version = parse(VERSION)
@@ -117,11 +212,15 @@ class ProxyVisaLibrary(highlevel.VisaLibraryBase):
             self._rpc_host, self._rpc_sync_port = self.library_path.split(":")
         except Exception:
             raise ValueError("No proxy host and port set.")
-        self._rpc_port, self._proxy_backend, self._proxy_version = sync_up(
-            self._rpc_host, self._rpc_sync_port, 2
-        )
+        reply = cached_sync_up(self._rpc_host, self._rpc_sync_port)
+        self._rpc_port: int = reply["rpc_port"]
+        self._proxy_backend = reply.get("backend")
+        self._proxy_version = reply.get("version")
         check_for_version_compatibility(self._proxy_version)
-        self._rpc_client = RpcClient(self._rpc_host, self._rpc_port)
+        self._rpc_endpoint = rpc_endpoint(self._rpc_host, reply)
+        self._rpc_client = RpcClient(
+            self._rpc_host, self._rpc_port, self._rpc_endpoint
+        )
 
     def _register(self, obj):
         """Create a random but unique session handle for a session object.
@@ -214,6 +313,7 @@ class ProxyVisaLibrary(highlevel.VisaLibraryBase):
             resource_name,
             self._rpc_host,
             self._rpc_port,
+            endpoint=self._rpc_endpoint,
             **kwargs,
         )
         return res
@@ -257,6 +357,72 @@ class ProxyVisaLibrary(highlevel.VisaLibraryBase):
             kwargs={"query": query},
         )
 
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Get request metrics and gauges of the proxy server.
+
+        :return: latency histograms per action, attribute and resource,
+            transferred bytes, queue depths and the number of open sessions
+        :rtype: typing.Dict[str, typing.Any]
+        """
+        return self._rpc_client.request(None, "stats")
+
+    def profile(
+        self,
+        duration: float,
+        mode: str = "sampling",
+        token: typing.Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """Profile the proxy server for a duration.
+
+        Only permitted for local clients or with the admin token of the
+        server.
+
+        :param duration: seconds to profile
+        :type duration: float
+        :param mode: ``cprofile`` for a pstats report of the event loop
+            thread or ``sampling`` for collapsed stacks of all threads,
+            defaults to "sampling"
+        :type mode: str
+        :param token: admin token of the server, defaults to None
+        :type token: typing.Optional[str]
+        :return: profiling report
+        :rtype: str
+        """
+        kwargs.update(duration=duration, mode=mode, token=token)
+        return self._rpc_client.request(None, "profile", kwargs=kwargs)
+
+    def memory_snapshot(
+        self,
+        limit: int = 20,
+        frames: int = 1,
+        stop: bool = False,
+        token: typing.Optional[str] = None,
+    ) -> typing.List[str]:
+        """Compare a memory snapshot of the proxy server to the previous one.
+
+        The first call starts tracing with tracemalloc, ``stop=True`` stops
+        it. Only permitted for local clients or with the admin token.
+
+        :param limit: number of listed allocation sites, defaults to 20
+        :type limit: int
+        :param frames: stack frames per allocation site, defaults to 1
+        :type frames: int
+        :param stop: stop tracing, defaults to False
+        :type stop: bool
+        :param token: admin token of the server, defaults to None
+        :type token: typing.Optional[str]
+        :return: allocation sites with size and count differences
+        :rtype: typing.List[str]
+        """
+        kwargs = {
+            "limit": limit,
+            "frames": frames,
+            "stop": stop,
+            "token": token,
+        }
+        return self._rpc_client.request(None, "memory_snapshot", kwargs=kwargs)
+
     def read(self, session, count):
         """Read data from device or interface synchronously.
 
@@ -0,0 +1,142 @@
+"""Client-side instrumentation hooks of PyVISA-proxy requests.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import typing
+
+_hooks: typing.List["RequestHook"] = []
+
+
+class RequestHook(object):
+    """Base class of hooks which are called around every RPC request.
+
+    The request information is a dictionary with the keys ``resource``,
+    ``action``, ``name``, ``args``, ``kwargs`` and ``bytes_sent`` before the
+    request.
+    Afterwards, ``duration`` in seconds, ``bytes_received`` and ``failed``
+    are added.
+    """
+
+    def before_request(self, info: typing.Dict[str, typing.Any]):
+        """Call before the request is sent."""
+
+    def after_request(self, info: typing.Dict[str, typing.Any]):
+        """Call after the reply has been received."""
+
+
+def add_request_hook(hook: RequestHook):
+    """Call a hook around the requests of all clients."""
+    _hooks.append(hook)
+
+
+def remove_request_hook(hook: RequestHook):
+    """Remove a hook which has been added by :func:`add_request_hook`."""
+    _hooks.remove(hook)
+
+
+def request_hooks() -> typing.List[RequestHook]:
+    """List the hooks which are called for all clients."""
+    return _hooks
+
+
+class RequestStats(RequestHook):
+    """Aggregate requests by action and attribute name.
+
+    Repeated identical requests in a row on the same resource, e.g. reading
+    a property in a loop, are reported as candidates for caching or
+    batching. Use it as context manager in order to aggregate all requests
+    within a block:
+
+    .. code-block:: python
+
+        with RequestStats() as stats:
+            run_test_step()
+        print(stats.report())
+    """
+
+    def __init__(self, repeat_threshold: int = 3):
+        """Initialize aggregator.
+
+        :param repeat_threshold: number of identical requests in a row which
+            is reported as repetition, defaults to 3
+        :type repeat_threshold: int
+        """
+        self.repeat_threshold = repeat_threshold
+        self.reset()
+
+    def reset(self):
+        """Drop all aggregated requests."""
+        #: count, total seconds, bytes sent and bytes received by request
+        self.calls: typing.Dict[
+            typing.Tuple[str, typing.Optional[str]], typing.List[float]
+        ] = {}
+        #: longest run and total repetitions by resource and request
+        self.repetitions: typing.Dict[tuple, typing.List[int]] = {}
+        self._last: typing.Dict[typing.Optional[str], tuple] = {}
+        self._run: typing.Dict[typing.Optional[str], int] = {}
+
+    def __enter__(self) -> "RequestStats":
+        """Aggregate all requests within the context."""
+        add_request_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        """Stop aggregating."""
+        remove_request_hook(self)
+
+    def after_request(self, info: typing.Dict[str, typing.Any]):
+        """Aggregate a finished request."""
+        entry = self.calls.setdefault((info["action"], info["name"]), [0] * 4)
+        entry[0] += 1
+        entry[1] += info["duration"]
+        entry[2] += info["bytes_sent"]
+        entry[3] += info["bytes_received"]
+        resource = info["resource"]
+        try:
+            arguments = hash((info["args"], tuple(info["kwargs"].items())))
+        except TypeError:
+            # Unhashable arguments are never considered as repetition
+            arguments = id(info)
+        key = (info["action"], info["name"], arguments)
+        if self._last.get(resource) == key:
+            self._run[resource] += 1
+        else:
+            self._last[resource] = key
+            self._run[resource] = 1
+        run = self._run[resource]
+        if run >= self.repeat_threshold:
+            repetition = self.repetitions.setdefault(
+                (resource, info["action"], info["name"]), [0, 0]
+            )
+            repetition[0] = max(repetition[0], run)
+            repetition[1] += 1 if run > self.repeat_threshold else run
+
+    @property
+    def total_calls(self) -> int:
+        """Number of aggregated requests."""
+        return int(sum(entry[0] for entry in self.calls.values()))
+
+    def report(self) -> str:
+        """Render the aggregated requests as table, slowest first."""
+        lines = [
+            f"{'action':<14}{'name':<24}{'calls':>7}{'total [ms]':>12}"
+            f"{'mean [ms]':>11}{'sent [B]':>10}{'received [B]':>14}"
+        ]
+        for (action, name), (count, total, sent, received) in sorted(
+            self.calls.items(), key=lambda item: -item[1][1]
+        ):
+            lines.append(
+                f"{action:<14}{name or '-':<24}{count:>7.0f}"
+                f"{total * 1e3:>12.2f}{total * 1e3 / count:>11.2f}"
+                f"{sent:>10.0f}{received:>14.0f}"
+            )
+        for (resource, action, name), (longest, total) in sorted(
+            self.repetitions.items(), key=lambda item: -item[1][1]
+        ):
+            lines.append(
+                f"repeated: {action} {name} on {resource} "
+                f"{total} times, up to {longest} in a row"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,261 @@
+"""Long-running job handling of the PyVISA-proxy server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+import typing
+import uuid
+
+import dill as pickle
+import zmq
+import zmq.asyncio
+
+LOGGER = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+#: Job which is executed by the current asyncio task
+current_job: "contextvars.ContextVar[typing.Optional[Job]]" = (
+    contextvars.ContextVar("current_job", default=None)
+)
+
+
+def _retrieve_exception(task: asyncio.Future):
+    """Mark a task exception as retrieved to avoid asyncio warnings."""
+    if not task.cancelled():
+        task.exception()
+
+
+class Job(object):
+    """Bookkeeping of a single server-side job."""
+
+    def __init__(self, owner: str, name: typing.Optional[str]):
+        """Initialize job."""
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.name = name
+        self.state = PENDING
+        self.submitted = time.time()
+        self.started: typing.Optional[float] = None
+        self.finished: typing.Optional[float] = None
+        self.task: typing.Optional[asyncio.Future] = None
+        #: Executor call which currently runs on behalf of the job
+        self.active: typing.Optional[asyncio.Future] = None
+
+    @property
+    def busy(self) -> bool:
+        """Return True while the job or its executor call is running.
+
+        A cancelled job keeps its executor thread busy until the driver call
+        returns.
+        """
+        return self.state not in FINISHED_STATES or (
+            self.active is not None and not self.active.done()
+        )
+
+    def status(self) -> typing.Dict[str, typing.Any]:
+        """Summarize the job state."""
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager(object):
+    """Run operations as asyncio tasks and keep their results."""
+
+    def __init__(
+        self,
+        ctx: zmq.asyncio.Context,
+        max_jobs: typing.Optional[int] = None,
+        result_ttl: float = 600.0,
+        endpoint: typing.Optional[str] = None,
+    ):
+        """Initialize job manager.
+
+        :param ctx: zmq context for the event publisher
+        :type ctx: zmq.asyncio.Context
+        :param max_jobs: maximum number of unfinished jobs, defaults to None
+        :type max_jobs: typing.Optional[int]
+        :param result_ttl: seconds to keep finished jobs, defaults to 600.0
+        :type result_ttl: float
+        :param endpoint: endpoint of the event publisher, defaults to None
+            (random TCP port)
+        :type endpoint: typing.Optional[str]
+        """
+        self.max_jobs = max_jobs
+        self.result_ttl = result_ttl
+        self.jobs: typing.Dict[str, Job] = {}
+        self.socket = ctx.socket(zmq.PUB)  # pylint: disable=E1101
+        self.events_port: typing.Optional[int] = None
+        #: Event publisher endpoint if it is not bound to TCP
+        self.events_endpoint = endpoint
+        if endpoint is not None:
+            self.socket.bind(endpoint)
+        else:
+            self.events_port = self.socket.bind_to_random_port("tcp://*")
+
+    def close(self):
+        """Close the event publisher."""
+        self.jobs.clear()
+        if self.socket:
+            self.socket.close()
+
+    def cancel_all(self) -> typing.List[asyncio.Future]:
+        """Cancel all unfinished jobs and return their tasks."""
+        tasks = [
+            job.task
+            for job in self.jobs.values()
+            if job.task is not None and not job.task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    def submit(
+        self,
+        owner: str,
+        name: typing.Optional[str],
+        operation: typing.Callable[[], typing.Awaitable],
+    ) -> Job:
+        """Submit an operation and return its job immediately.
+
+        :param owner: identity of the submitting session
+        :type owner: str
+        :param name: descriptive name of the operation
+        :type name: typing.Optional[str]
+        :param operation: coroutine function which performs the operation
+        :type operation: typing.Callable[[], typing.Awaitable]
+        :raises RuntimeError: if the maximum number of jobs is reached
+        :return: submitted job
+        :rtype: Job
+        """
+        self.purge()
+        if self.max_jobs is not None and self.running() >= self.max_jobs:
+            raise RuntimeError(
+                f"Maximum number of {self.max_jobs} running jobs reached."
+            )
+        job = Job(owner, name)
+        job.task = asyncio.ensure_future(self._run(job, operation))
+        job.task.add_done_callback(_retrieve_exception)
+        self.jobs[job.id] = job
+        return job
+
+    async def _run(
+        self, job: Job, operation: typing.Callable[[], typing.Awaitable]
+    ) -> typing.Any:
+        """Run operation and track the job state."""
+        current_job.set(job)
+        job.state = RUNNING
+        job.started = time.time()
+        try:
+            res = await operation()
+        except asyncio.CancelledError:
+            job.state = CANCELLED
+            raise
+        except Exception:
+            job.state = FAILED
+            raise
+        else:
+            job.state = DONE
+            return res
+        finally:
+            job.finished = time.time()
+            LOGGER.debug("Job %s finished with state %s", job.id, job.state)
+            await self._publish(job)
+
+    async def _publish(self, job: Job):
+        """Notify subscribers about a finished job."""
+        try:
+            await self.socket.send_multipart(
+                [job.id.encode(), pickle.dumps(job.status())]
+            )
+        except zmq.ZMQError:
+            LOGGER.debug("Could not publish state of job %s", job.id)
+
+    def get(self, job_id: str, owner: typing.Optional[str] = None) -> Job:
+        """Get a job by its ID.
+
+        :param job_id: job ID
+        :type job_id: str
+        :param owner: identity of the requesting session, defaults to None
+            (no restriction)
+        :type owner: typing.Optional[str]
+        :raises KeyError: if the job is unknown, expired or owned by another
+            session
+        """
+        self.purge()
+        job = self.jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            raise KeyError(f"Job {job_id} is unknown or expired.")
+        return job
+
+    def owned(self, owner: str) -> typing.List[Job]:
+        """List all jobs of a session."""
+        self.purge()
+        return [job for job in self.jobs.values() if job.owner == owner]
+
+    async def result(
+        self,
+        job_id: str,
+        owner: typing.Optional[str] = None,
+        timeout: typing.Optional[float] = None,
+    ) -> typing.Any:
+        """Wait for a job and return its result.
+
+        :raises TimeoutError: if the job did not finish in time
+        :raises Exception: exception raised by the job operation
+        """
+        job = self.get(job_id, owner)
+        task = typing.cast(asyncio.Future, job.task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Job {job_id} did not finish in time.")
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            raise RuntimeError(f"Job {job_id} was cancelled.")
+
+    def cancel(self, job_id: str, owner: typing.Optional[str] = None) -> bool:
+        """Cancel a job which has not finished yet."""
+        job = self.get(job_id, owner)
+        task = typing.cast(asyncio.Future, job.task)
+        return task.cancel()
+
+    def cancel_owned(self, owner: str):
+        """Cancel all unfinished jobs of a session."""
+        for job in self.jobs.values():
+            if job.owner == owner and job.task is not None:
+                job.task.cancel()
+
+    def running(self) -> int:
+        """Count jobs which are unfinished or still occupy a thread."""
+        return sum(1 for job in self.jobs.values() if job.busy)
+
+    def purge(self):
+        """Drop finished jobs whose results expired."""
+        deadline = time.time() - self.result_ttl
+        expired = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.finished is not None
+            and job.finished < deadline
+            and not job.busy
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
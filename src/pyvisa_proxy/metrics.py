@@ -0,0 +1,221 @@
+"""Request metrics of the PyVISA-proxy server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+import typing
+
+LOGGER = logging.getLogger(__name__)
+
+#: Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram(object):
+    """Latency histogram with cumulative buckets like Prometheus."""
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize histogram."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Add a measured value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        """Summarize the histogram with cumulative bucket counts."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class ServerMetrics(object):
+    """Counters and histograms of the requests handled by a server.
+
+    Requests are labeled by action, attribute name and resource name.
+    """
+
+    def __init__(self):
+        """Initialize metrics."""
+        self.started = time.time()
+        self.requests: typing.Dict[typing.Tuple[str, str, str], Histogram] = {}
+        self.errors: typing.Dict[typing.Tuple[str, str, str], int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        #: Calls which wait for a free executor thread
+        self.executor_queue = 0
+        #: Calls which wait for their session handle
+        self.handle_queue = 0
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        action: str,
+        name: str,
+        resource: str,
+        seconds: float,
+        failed: bool = False,
+    ):
+        """Record the latency of a handled request."""
+        key = (action, name, resource)
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests[key] = Histogram()
+        histogram.observe(seconds)
+        if failed:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def enqueue(self):
+        """Count a call which has been submitted to an executor."""
+        with self._lock:
+            self.executor_queue += 1
+
+    def dequeue(self):
+        """Count a call which has been started by an executor thread."""
+        with self._lock:
+            self.executor_queue -= 1
+
+    def snapshot(self, **gauges) -> typing.Dict[str, typing.Any]:
+        """Summarize all metrics.
+
+        :param gauges: additional gauges like the number of open sessions
+        :return: metrics which can be pickled and rendered
+        :rtype: typing.Dict[str, typing.Any]
+        """
+        requests = []
+        for (action, name, resource), histogram in self.requests.items():
+            entry = histogram.snapshot()
+            entry.update(
+                action=action,
+                name=name,
+                resource=resource,
+                errors=self.errors.get((action, name, resource), 0),
+            )
+            requests.append(entry)
+        snapshot = {
+            "uptime": time.time() - self.started,
+            "requests": requests,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "executor_queue": self.executor_queue,
+            "handle_queue": self.handle_queue,
+        }
+        snapshot.update(gauges)
+        return snapshot
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snapshot: typing.Dict[str, typing.Any]) -> str:
+    """Render a metrics snapshot in the Prometheus text format."""
+    lines = [
+        "# TYPE pyvisa_proxy_request_seconds histogram",
+    ]
+    for entry in snapshot["requests"]:
+        labels = ",".join(
+            f'{key}="{_escape(entry[key])}"'
+            for key in ("action", "name", "resource")
+        )
+        for bound, count in entry["buckets"].items():
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                "pyvisa_proxy_request_seconds_bucket"
+                f'{{{labels},le="{le}"}} {count}'
+            )
+        lines.append(
+            f"pyvisa_proxy_request_seconds_sum{{{labels}}} {entry['sum']}"
+        )
+        lines.append(
+            f"pyvisa_proxy_request_seconds_count{{{labels}}} {entry['count']}"
+        )
+    lines.append("# TYPE pyvisa_proxy_request_errors_total counter")
+    for entry in snapshot["requests"]:
+        labels = ",".join(
+            f'{key}="{_escape(entry[key])}"'
+            for key in ("action", "name", "resource")
+        )
+        lines.append(
+            f"pyvisa_proxy_request_errors_total{{{labels}}} {entry['errors']}"
+        )
+    for key in ("bytes_in", "bytes_out"):
+        lines.append(f"# TYPE pyvisa_proxy_{key}_total counter")
+        lines.append(f"pyvisa_proxy_{key}_total {snapshot[key]}")
+    for key, value in snapshot.items():
+        if key not in ("requests", "bytes_in", "bytes_out") and isinstance(
+            value, (int, float)
+        ):
+            lines.append(f"# TYPE pyvisa_proxy_{key} gauge")
+            lines.append(f"pyvisa_proxy_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def serve_prometheus(
+    collect: typing.Callable[[], typing.Dict[str, typing.Any]],
+    port: int,
+    host: str = "127.0.0.1",
+) -> asyncio.AbstractServer:
+    """Serve metrics snapshots in the Prometheus text format via HTTP.
+
+    :param collect: function which returns a metrics snapshot
+    :type collect: typing.Callable[[], typing.Dict[str, typing.Any]]
+    :param port: TCP port of the endpoint
+    :type port: int
+    :param host: interface to bind, defaults to "127.0.0.1"
+    :type host: str
+    :return: running HTTP server
+    :rtype: asyncio.AbstractServer
+    """
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            # The request is not inspected, every path returns the metrics
+            while (await reader.readline()).strip():
+                pass
+            body = render_prometheus(collect()).encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            LOGGER.debug("Metrics client disconnected")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
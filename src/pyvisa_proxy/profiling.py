@@ -0,0 +1,168 @@
+"""On-demand CPU and memory profiling of a running PyVISA-proxy server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+import cProfile
+import collections
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+import types
+import typing
+
+PROFILER_MODES = ("cprofile", "sampling")
+
+
+class SamplingProfiler(object):
+    """Sample the stacks of all threads periodically.
+
+    In contrast to cProfile, the executor threads which call the drivers are
+    covered as well and the overhead is independent of the call rate.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """Initialize profiler.
+
+        :param interval: seconds between samples, defaults to 0.005
+        :type interval: float
+        """
+        self.interval = interval
+        self.stacks: typing.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pyvisa-proxy-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Sample until stopped."""
+        own = threading.get_ident()
+        names: typing.Dict[typing.Optional[int], str] = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {
+                    thread.ident: thread.name
+                    for thread in threading.enumerate()
+                }
+            for ident, top in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                frame: typing.Optional[types.FrameType] = top
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Render the samples as collapsed stacks for flame graphs."""
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.stacks.most_common()
+        )
+
+
+async def profile(
+    duration: float,
+    mode: str = "sampling",
+    interval: float = 0.005,
+    limit: int = 50,
+) -> str:
+    """Profile the running process for a duration.
+
+    The event loop keeps serving requests in the meantime.
+
+    :param duration: seconds to profile
+    :type duration: float
+    :param mode: ``cprofile`` for deterministic profiling of the event loop
+        thread or ``sampling`` for all threads, defaults to "sampling"
+    :type mode: str
+    :param interval: seconds between samples, defaults to 0.005
+    :type interval: float
+    :param limit: number of functions of the cProfile report, defaults to 50
+    :type limit: int
+    :raises ValueError: if the mode is unknown
+    :return: pstats report or collapsed stacks
+    :rtype: str
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return stream.getvalue()
+    if mode == "sampling":
+        sampler = SamplingProfiler(interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            sampler.stop()
+        return sampler.collapsed()
+    raise ValueError(f"Unknown profiler mode {mode}, use {PROFILER_MODES}.")
+
+
+class MemoryTracker(object):
+    """Compare tracemalloc snapshots in order to find memory growth."""
+
+    def __init__(self):
+        """Initialize tracker."""
+        self._snapshot: typing.Optional[tracemalloc.Snapshot] = None
+        self._started = False
+
+    def snapshot(self, limit: int = 20, frames: int = 1) -> typing.List[str]:
+        """Take a snapshot and list the largest changes to the previous one.
+
+        The first call starts tracing and returns an empty list.
+
+        :param limit: number of listed allocation sites, defaults to 20
+        :type limit: int
+        :param frames: number of stack frames per allocation site,
+            defaults to 1
+        :type frames: int
+        :return: allocation sites with size and count differences
+        :rtype: typing.List[str]
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started = True
+            self._snapshot = None
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            return []
+        key = "traceback" if frames > 1 else "lineno"
+        stats = snapshot.compare_to(previous, key)
+        return [str(stat) for stat in stats[:limit]]
+
+    def stop(self):
+        """Stop tracing if it has been started by the tracker."""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        self._snapshot = None
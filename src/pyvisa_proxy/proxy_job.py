@@ -0,0 +1,131 @@
+"""PyVISA-proxy job which tracks a long-running operation at server side.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import time
+import typing
+
+import zmq
+
+from .rpc_client import RpcClient
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+
+class ProxyJob(object):
+    """Handle of an operation which is executed as job at server side."""
+
+    def __init__(
+        self, rpc_client: RpcClient, job_id: str, events_endpoint: str
+    ):
+        """Initialize proxy job."""
+        self._rpc_client = rpc_client
+        self.job_id = job_id
+        self.events_endpoint = events_endpoint
+
+    def __repr__(self) -> str:
+        """Represent job by its ID."""
+        return f"<ProxyJob {self.job_id}>"
+
+    @property
+    def host(self) -> str:
+        """Host of the server which runs the job."""
+        return self._rpc_client.host
+
+    def status(self) -> typing.Dict[str, typing.Any]:
+        """Poll the job state.
+
+        :return: job status with ``state`` and timestamps
+        :rtype: typing.Dict[str, typing.Any]
+        """
+        return self._rpc_client.request(self.job_id, "job_status")
+
+    def done(self) -> bool:
+        """Return True if the job has finished."""
+        return self.status()["state"] in FINISHED_STATES
+
+    def result(self, timeout: typing.Optional[float] = None) -> typing.Any:
+        """Wait for the job and return the result of the operation.
+
+        :param timeout: seconds to wait, defaults to None (infinite)
+        :type timeout: typing.Optional[float]
+        :raises TimeoutError: if the job did not finish in time
+        :raises Exception: reraise Exception of the operation
+        :return: result of the operation
+        :rtype: typing.Any
+        """
+        return self._rpc_client.request(
+            self.job_id, "job_result", kwargs={"timeout": timeout}
+        )
+
+    def cancel(self) -> bool:
+        """Cancel the job if it has not finished yet.
+
+        A driver call which is already running cannot be interrupted.
+        """
+        return self._rpc_client.request(self.job_id, "cancel_job")
+
+
+def wait(
+    jobs: typing.Iterable[ProxyJob],
+    timeout: typing.Optional[float] = None,
+    poll_interval: float = 10.0,
+) -> typing.Tuple[typing.Set[ProxyJob], typing.Set[ProxyJob]]:
+    """Wait for jobs by subscribing to the completion events of the servers.
+
+    The job states are polled once after subscribing. Afterwards, only the
+    completion events are awaited. Events which got lost because they were
+    published before the subscription was established are caught by polling
+    the states of the remaining jobs every ``poll_interval``.
+
+    :param jobs: jobs to wait for
+    :type jobs: typing.Iterable[ProxyJob]
+    :param timeout: seconds to wait, defaults to None (infinite)
+    :type timeout: typing.Optional[float]
+    :param poll_interval: seconds between job state polls, defaults to 10.0
+    :type poll_interval: float
+    :return: sets of finished and unfinished jobs
+    :rtype: typing.Tuple[typing.Set[ProxyJob], typing.Set[ProxyJob]]
+    """
+    pending = {job.job_id: job for job in jobs}
+    done: typing.Set[ProxyJob] = set()
+    ctx: zmq.Context = zmq.Context.instance()
+    poller = zmq.Poller()
+    sockets: typing.Dict[str, zmq.Socket] = {}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        for job in pending.values():
+            key = job.events_endpoint
+            if key not in sockets:
+                socket = ctx.socket(zmq.SUB)  # pylint: disable=E1101
+                socket.connect(key)
+                poller.register(socket, zmq.POLLIN)
+                sockets[key] = socket
+            sockets[key].setsockopt(
+                zmq.SUBSCRIBE, job.job_id.encode()  # pylint: disable=E1101
+            )
+        while pending:
+            for job_id, job in list(pending.items()):
+                if job.done():
+                    done.add(pending.pop(job_id))
+            if not pending:
+                break
+            next_poll = time.monotonic() + poll_interval
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    break
+                next_poll = min(next_poll, deadline)
+            while pending:
+                remaining = next_poll - time.monotonic()
+                if remaining <= 0:
+                    break
+                for socket, _ in poller.poll(int(remaining * 1000) + 1):
+                    job_id = socket.recv_multipart()[0].decode()
+                    if job_id in pending:
+                        done.add(pending.pop(job_id))
+    finally:
+        for socket in sockets.values():
+            socket.close()
+    return done, set(pending.values())
@@ -6,8 +6,11 @@
 
 import typing
 
+import dill as pickle
 from pyvisa import Resource
 
+from .hooks import RequestHook
+from .proxy_job import ProxyJob
 from .rpc_client import RpcClient
 
 
@@ -20,12 +23,14 @@ class ProxyResource(Resource):
         resource_name: str,
         host: str,
         rpc_port: int,
+        endpoint: typing.Optional[str] = None,
         **kwargs,
     ):
         """Initialize proxy resource."""
         self._rpc_client: typing.Optional[RpcClient] = RpcClient(
-            host, rpc_port
+            host, rpc_port, endpoint
         )
+        self._rpc_client.resource = resource_name
         self._resource_cls = resource_cls
         self._resource_name = resource_name
         # Open the resource
@@ -45,6 +50,95 @@ class ProxyResource(Resource):
             self._rpc_client = None
         return None
 
+    def register_macro(
+        self, name: str, steps: typing.Sequence[typing.Dict[str, typing.Any]]
+    ) -> None:
+        """Register a named command sequence at server side.
+
+        Each step is a dictionary with the attribute ``name`` to call or
+        read and optional ``args``, ``kwargs`` and ``capture`` keys. String
+        arguments may contain ``{placeholder}`` fields which are filled in by
+        :meth:`run_macro`. An argument which consists of a single
+        placeholder keeps the type of the parameter. Use ``{{`` and ``}}``
+        for literal braces next to placeholders. Steps with a ``capture`` key
+        contribute their result under that key to the macro result.
+
+        :param name: macro name
+        :type name: str
+        :param steps: sequence of step descriptions
+        :type steps: typing.Sequence[dict]
+        """
+        typing.cast(RpcClient, self._rpc_client).request(
+            name, "register_macro", value=list(steps)
+        )
+
+    def run_macro(self, name: str, **params) -> typing.Dict[str, typing.Any]:
+        """Run a registered command sequence in a single round trip.
+
+        :param name: macro name
+        :type name: str
+        :return: captured step results
+        :rtype: typing.Dict[str, typing.Any]
+        """
+        return typing.cast(RpcClient, self._rpc_client).request(
+            name, "run_macro", kwargs=params
+        )
+
+    def execute(self, func: typing.Callable, *args, **kwargs) -> typing.Any:
+        """Execute a callable next to the instrument at server side.
+
+        The callable is serialized with dill and called as
+        ``func(resource, *args, **kwargs)`` with the server's pyvisa resource
+        handle. The server has to permit remote execution for this client.
+
+        :param func: callable to ship to the server
+        :type func: typing.Callable
+        :return: return value of the callable
+        :rtype: typing.Any
+        """
+        return typing.cast(RpcClient, self._rpc_client).request(
+            None,
+            "execute",
+            args=args,
+            value=pickle.dumps(func, recurse=True),
+            kwargs=kwargs,
+        )
+
+    def submit(self, name: str, *args, **kwargs) -> ProxyJob:
+        """Call a resource method as job at server side.
+
+        The call returns immediately. Use the returned job in order to poll,
+        await or cancel the operation, e.g. a calibration routine which
+        blocks for minutes.
+
+        :param name: name of the resource method
+        :type name: str
+        :return: job handle
+        :rtype: ProxyJob
+        """
+        rpc_client = typing.cast(RpcClient, self._rpc_client)
+        rep = rpc_client.request(name, "submit_job", args=args, kwargs=kwargs)
+        events_endpoint = rep.get("events_endpoint") or (
+            f"tcp://{rpc_client.host}:{rep['events_port']}"
+        )
+        return ProxyJob(rpc_client, rep["job_id"], events_endpoint)
+
+    def add_request_hook(self, hook: RequestHook) -> None:
+        """Call a hook around the requests of this resource only.
+
+        :param hook: hook which is called before and after every request
+        :type hook: RequestHook
+        """
+        typing.cast(RpcClient, self._rpc_client).hooks.append(hook)
+
+    def remove_request_hook(self, hook: RequestHook) -> None:
+        """Remove a hook which has been added by :meth:`add_request_hook`.
+
+        :param hook: hook to remove
+        :type hook: RequestHook
+        """
+        typing.cast(RpcClient, self._rpc_client).hooks.remove(hook)
+
     def _is_fixed_attr(self, name: str) -> bool:
         return name in [
             "_rpc_client",
@@ -53,6 +147,12 @@ class ProxyResource(Resource):
             "_request",
             "_is_fixed_attr",
             "close",
+            "register_macro",
+            "run_macro",
+            "execute",
+            "submit",
+            "add_request_hook",
+            "remove_request_hook",
         ]
 
     def __getattr__(self, name):
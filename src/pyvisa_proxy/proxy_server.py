@@ -5,14 +5,21 @@
 """
 
 import asyncio
+import fnmatch
+import functools
+import hmac
 import json
 import logging
 import os
+import platform
+import re
 import sys
+import tempfile
 import time
 import typing
 from abc import ABC, abstractmethod
-from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread, get_ident
 
 import dill as pickle
 import pyvisa
@@ -23,6 +30,12 @@ from pyvisa import InvalidSession
 from tblib import pickling_support
 
 from ._version_handling import get_version
+from .backends import Backend, BackendRouter
+from .jobs import JobManager, current_job
+from .metrics import ServerMetrics, serve_prometheus
+from .profiling import MemoryTracker, profile
+from .slowlog import SlowRequestLog, describe, describe_request
+from .tracing import RequestTrace, current_trace
 
 pickling_support.install()
 
@@ -30,27 +43,131 @@ VERSION = get_version()
 LOGGER = logging.getLogger(__name__)
 
 
-with open(
-    os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "data", "job.schema.json")
-    ),
-    "r",
-    encoding="utf-8",
-) as fp:
-    schema = json.load(fp)
-    REFERENCE = validator_for(schema)
-    VALIDATOR = extend(
-        REFERENCE,
-        type_checker=REFERENCE.TYPE_CHECKER.redefine(
-            "array",
-            lambda checker, instance: REFERENCE.TYPE_CHECKER.is_type(
-                instance, "array"
-            )
-            or isinstance(instance, tuple),
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "job.schema.json"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def job_validator():
+    """Load and compile the schema of job descriptions on first use."""
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as fp:
+        schema = json.load(fp)
+    reference = validator_for(schema)
+    return extend(
+        reference,
+        type_checker=reference.TYPE_CHECKER.redefine_many(
+            {
+                "array": lambda checker, instance: (
+                    reference.TYPE_CHECKER.is_type(instance, "array")
+                    or isinstance(instance, tuple)
+                ),
+                "bytes": lambda checker, instance: isinstance(instance, bytes),
+            }
         ),
     )(schema=schema)
 
 
+_PLACEHOLDER = re.compile(r"\{\{|\}\}|\{([A-Za-z_]\w*)\}")
+
+
+def _substitute(value: typing.Any, params: dict) -> typing.Any:
+    """Replace ``{name}`` placeholders in strings by macro parameters.
+
+    A string which consists of a single placeholder is replaced by the
+    parameter itself in order to keep its type. ``{{`` and ``}}`` are
+    unescaped, all other braces are kept literally.
+    """
+    if isinstance(value, str):
+        match = _PLACEHOLDER.fullmatch(value)
+        if match is not None and match.group(1) is not None:
+            return _lookup_parameter(params, match.group(1))
+
+        def replace(match: typing.Match) -> str:
+            if match.group(1) is None:
+                return match.group(0)[0]
+            return str(_lookup_parameter(params, match.group(1)))
+
+        return _PLACEHOLDER.sub(replace, value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_substitute(item, params) for item in value)
+    if isinstance(value, dict):
+        return {key: _substitute(item, params) for key, item in value.items()}
+    return value
+
+
+def _lookup_parameter(params: dict, name: str) -> typing.Any:
+    """Get a macro parameter by its placeholder name."""
+    try:
+        return params[name]
+    except KeyError:
+        raise KeyError(f"Macro parameter {name} is missing.")
+
+
+#: Peer address of clients which are connected via ipc:// or inproc://
+LOCAL_PEER = "127.0.0.1"
+
+
+def _peer_address(frame: zmq.Frame) -> typing.Optional[str]:
+    """Get the transport address of the peer which sent a frame.
+
+    Peers on ipc:// endpoints report their process credentials as
+    ``localhost:<uid>:<gid>:<pid>`` and are mapped to :data:`LOCAL_PEER`.
+    """
+    try:
+        address = typing.cast(str, frame.get("Peer-Address"))
+    except zmq.ZMQError:
+        return None
+    if address.startswith("localhost:"):
+        return LOCAL_PEER
+    return address
+
+
+def encode_sync_reply(
+    rpc_port: int, backend: str, version: str, **extra
+) -> bytes:
+    """Encode the reply to synchronization requests once."""
+    reply = {
+        "rpc_port": rpc_port,
+        "backend": backend,
+        "version": version,
+    }
+    reply.update(extra)
+    return pickle.dumps(reply)
+
+
+def async_context() -> zmq.asyncio.Context:
+    """Get an asyncio context which shares the process-wide zmq context.
+
+    Sharing the context allows in-process clients to connect via inproc://.
+    """
+    return zmq.asyncio.Context.shadow(zmq.Context.instance().underlying)
+
+
+def inproc_endpoint(name: str, channel: str) -> str:
+    """Get the inproc:// endpoint of an embedded server channel."""
+    return f"inproc://pyvisa-proxy.{name}.{channel}"
+
+
+def ipc_endpoint(rpc_port: int) -> str:
+    """Get the ipc:// endpoint of the RPC channel of a server."""
+    path = os.path.join(tempfile.gettempdir(), f"pyvisa-proxy-{rpc_port}.rpc")
+    return f"ipc://{path}"
+
+
+def _has_pending_message(socket: zmq.Socket) -> bool:
+    """Check without blocking whether a message can be received."""
+    events = typing.cast(
+        int, socket.getsockopt(zmq.EVENTS)  # pylint: disable=E1101
+    )
+    return bool(events & zmq.POLLIN)  # pylint: disable=E1101
+
+
+def _decode_identity(identity: bytes) -> str:
+    """Decode a socket identity which may have been generated by zmq."""
+    return identity.decode(errors="backslashreplace")
+
+
 class ProcessorInterface(ABC):
     """Interface class for processors."""
 
@@ -69,16 +186,25 @@ class SynchronizationProcessor(ProcessorInterface):
     """Synchronization implementation class."""
 
     def __init__(
-        self, sync_port: int, rpc_port: int, backend: str, version: str
+        self,
+        sync_port: int,
+        rpc_port: int,
+        backend: str,
+        version: str,
+        endpoint: typing.Optional[str] = None,
+        extra: typing.Optional[typing.Dict[str, typing.Any]] = None,
     ):
         """Initialize processor."""
-        self.ctx = zmq.asyncio.Context.instance()
+        self.ctx = async_context()
         self.socket = self.ctx.socket(zmq.ROUTER)  # pylint: disable=E1101
-        self.socket.bind(f"tcp://*:{sync_port}")
+        self.socket.bind(endpoint or f"tcp://*:{sync_port}")
         self.port = sync_port
         self.rpc_port = rpc_port
         self.backend = backend
         self.version = version
+        self.reply = encode_sync_reply(
+            rpc_port, backend, version, **(extra or {})
+        )
 
     def close(self):
         """Close connections."""
@@ -86,49 +212,185 @@ class SynchronizationProcessor(ProcessorInterface):
             self.socket.close()
 
     async def call(self) -> None:
-        """Process synchronization call."""
-        address, _, _ = await self.socket.recv_multipart()
-        LOGGER.debug("Received sync request from %s", address)
-        reply = {
-            "rpc_port": self.rpc_port,
-            "backend": self.backend,
-            "version": self.version,
-        }
-        await self.socket.send_multipart([address, b"", pickle.dumps(reply)])
-        LOGGER.debug("Replied sync request to %s", address)
+        """Process all pending synchronization calls."""
+        addresses = []
+        while True:
+            address, _, _ = await self.socket.recv_multipart()
+            LOGGER.debug("Received sync request from %s", address)
+            addresses.append(address)
+            if not _has_pending_message(self.socket):
+                break
+        for address in addresses:
+            await self.socket.send_multipart([address, b"", self.reply])
+            LOGGER.debug("Replied sync request to %s", address)
 
 
 class RpcProcessor(ProcessorInterface):
     """Synchronization implementation class."""
 
-    def __init__(self, backend: str, port: typing.Optional[int] = None):
-        """Initialize processor."""
-        self.rm = pyvisa.ResourceManager(backend)
+    def __init__(
+        self,
+        backend: str,
+        port: typing.Optional[int] = None,
+        execute_allowlist: typing.Optional[typing.Sequence[str]] = None,
+        execute_timeout: typing.Optional[float] = None,
+        max_jobs: typing.Optional[int] = None,
+        job_result_ttl: float = 600.0,
+        ipc: bool = False,
+        inproc: typing.Optional[str] = None,
+        admin_token: typing.Optional[str] = None,
+        slow_log: typing.Optional[SlowRequestLog] = None,
+    ):
+        """Initialize processor.
+
+        The RPC channel is bound to TCP and additionally to an ipc://
+        endpoint if ``ipc`` is set. An embedded processor with an ``inproc``
+        name is bound to inproc:// endpoints only. Several backends are
+        given as comma-separated list, see
+        :func:`~pyvisa_proxy.backends.parse_backends`.
+        """
+        self.backends = BackendRouter(backend)
+        self.rm = self.backends.default.rm
         self.visa: typing.Dict[str, list] = {}
-        self.ctx = zmq.asyncio.Context.instance()
+        self.macros: typing.Dict[str, typing.Dict[str, list]] = {}
+        self.execute_allowlist = list(execute_allowlist or [])
+        self.execute_timeout = execute_timeout
+        self.admin_token = admin_token
+        self.slow_log = slow_log or SlowRequestLog()
+        self.memory = MemoryTracker()
+        self._execute_executor: typing.Optional[ThreadPoolExecutor] = None
+        if self.execute_allowlist:
+            self._execute_executor = ThreadPoolExecutor(
+                thread_name_prefix="pyvisa-proxy-execute"
+            )
+        self.ctx = async_context()
+        self.jobs = JobManager(
+            self.ctx,
+            max_jobs,
+            job_result_ttl,
+            None if inproc is None else inproc_endpoint(inproc, "events"),
+        )
+        self._tasks: typing.Set[asyncio.Future] = set()
+        self._handle_locks: typing.Dict[str, asyncio.Lock] = {}
+        self._handle_backends: typing.Dict[str, Backend] = {}
+        self.metrics = ServerMetrics()
+        self.validator = job_validator()
         self.socket = self.ctx.socket(zmq.ROUTER)  # pylint: disable=E1101
-        if port is not None:
+        #: Endpoints which are advertised to clients
+        self.endpoints: typing.Dict[str, typing.Any] = {
+            "node": platform.node(),
+            "ipc": None,
+            "rpc_endpoint": None,
+        }
+        if inproc is not None:
+            self.port = 0
+            self.endpoints["rpc_endpoint"] = inproc_endpoint(inproc, "rpc")
+            self.socket.bind(self.endpoints["rpc_endpoint"])
+        elif port is not None:
             self.port = port
             self.socket.bind(f"tcp://*:{port}")
         else:
             self.port = self.socket.bind_to_random_port("tcp://*")
+        if ipc and inproc is None and zmq.has("ipc"):
+            self.endpoints["ipc"] = ipc_endpoint(self.port)
+            self.socket.bind(self.endpoints["ipc"])
+        self.sync_reply = encode_sync_reply(
+            self.port, backend, VERSION, **self.endpoints
+        )
 
     def close(self):
         """Close connections."""
         for handle in list(self.visa.values()):
             handle[0].close()
+        if self._execute_executor is not None:
+            self._execute_executor.shutdown(wait=False)
+            self._execute_executor = None
+        self.jobs.close()
+        self.backends.close()
+        self.memory.stop()
         if self.socket:
             self.socket.close()
 
+    async def shutdown(self):
+        """Cancel and drain running requests and jobs."""
+        tasks = list(self._tasks) + self.jobs.cancel_all()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     async def call(self):
-        """Process RPC call."""
-        identity, _, request = await self.socket.recv_multipart()
+        """Receive pending RPC calls and process them concurrently."""
+        while True:
+            frames = await self.socket.recv_multipart(copy=False)
+            received = time.perf_counter()
+            identity, request = frames[0].bytes, frames[-1].bytes
+            if self.endpoints["rpc_endpoint"] is not None:
+                # Embedded servers only serve clients in the same process
+                peer: typing.Optional[str] = LOCAL_PEER
+            else:
+                peer = _peer_address(frames[-1])
+            task = asyncio.ensure_future(
+                self._process(identity, request, peer, received)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if not _has_pending_message(self.socket):
+                break
+
+    async def _process(
+        self,
+        identity: bytes,
+        request: bytes,
+        peer: typing.Optional[str],
+        received: typing.Optional[float] = None,
+    ):
+        """Process RPC call and send the reply.
+
+        The phases of a request with the ``trace`` flag are returned in an
+        additional reply frame.
+        """
+        if not request:
+            # Synchronization request in single port mode
+            await self.socket.send_multipart([identity, b"", self.sync_reply])
+            return
+        started = time.perf_counter()
+        self.metrics.bytes_in += len(request)
         job_data = pickle.loads(request)
-        LOGGER.debug("Job %s from %s", job_data, identity)
-        reply = await self._call_pyvisa(identity, job_data)
-        await self.socket.send_multipart([identity, b"", pickle.dumps(reply)])
+        traced = isinstance(job_data, dict) and bool(job_data.get("trace"))
+        request_trace = None
+        if traced or self.slow_log.enabled:
+            request_trace = RequestTrace(received or started)
+            request_trace.span("receive", request_trace.received, started)
+            request_trace.span("decode", started, time.perf_counter())
+            current_trace.set(request_trace)
+        result = await self._call_pyvisa(identity, job_data, peer)
+        encoding = time.perf_counter()
+        reply = pickle.dumps(result)
+        self.metrics.bytes_out += len(reply)
+        frames = [identity, b"", reply]
+        if request_trace is not None:
+            request_trace.span("encode", encoding, time.perf_counter())
+            if traced:
+                frames.append(pickle.dumps(request_trace.spans))
+        await self.socket.send_multipart(frames)
+        if request_trace is not None:
+            name = _decode_identity(identity)
+            self.slow_log.observe(
+                time.perf_counter() - request_trace.received,
+                name,
+                self._resource_name(name),
+                job_data,
+                len(request),
+                len(reply),
+                request_trace.spans,
+            )
 
-    async def _call_pyvisa(self, identity: bytes, job_data: dict) -> dict:
+    async def _call_pyvisa(
+        self,
+        identity: bytes,
+        job_data: dict,
+        peer: typing.Optional[str] = None,
+    ) -> dict:
         """Call pyvisa with job information from client.
 
         :param msg: job description message
@@ -137,28 +399,77 @@ class RpcProcessor(ProcessorInterface):
         :rtype: zmq.Frame
         """
         result = {}
+        start = time.perf_counter()
         try:
-            VALIDATOR.validate(job_data, schema)
-            res = await self._execute_job(identity.decode(), job_data)
+            self.validator.validate(job_data)
+            request_trace = current_trace.get()
+            if request_trace is not None:
+                request_trace.span("validate", start, time.perf_counter())
+            res = await self._execute_job(
+                _decode_identity(identity), job_data, peer
+            )
         except Exception as err:
             # Unfortunately, no simple and lightweight solution
             # https://stackoverflow.com/a/45241491
             LOGGER.exception(
                 "Job %s from %s failed and threw %s",
-                job_data,
-                identity.decode(),
+                describe_request(job_data),
+                _decode_identity(identity),
                 err,
             )
             result["exception"] = pickle.dumps(sys.exc_info())
         else:
-            LOGGER.debug(
-                "Job %s from %s result: %s", job_data, identity.decode(), res
-            )
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(
+                    "Job %s from %s result: %s",
+                    describe_request(job_data),
+                    _decode_identity(identity),
+                    describe(res),
+                )
             result["value"] = res
+        self._observe(
+            _decode_identity(identity),
+            job_data,
+            time.perf_counter() - start,
+            "exception" in result,
+        )
         return result
 
+    def _observe(
+        self, identity: str, job_data: dict, seconds: float, failed: bool
+    ):
+        """Record request metrics labeled by action, attribute and resource.
+
+        Only attribute names and macro names are used as name label, job IDs
+        and resource names would grow the number of label sets unbounded.
+        """
+        if not isinstance(job_data, dict):
+            return
+        action = str(job_data.get("action"))
+        name = ""
+        if action in ("getattr", "setattr", "run_macro", "submit_job"):
+            name = str(job_data.get("name"))
+        resource = self._resource_name(identity)
+        self.metrics.observe(action, name, resource, seconds, failed)
+
+    def _resource_name(self, identity: str) -> str:
+        """Get the resource name of a session or an empty string."""
+        handle = self.visa.get(identity)
+        return handle[0].resource_name if handle is not None else ""
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Get a snapshot of the request metrics and server gauges."""
+        return self.metrics.snapshot(
+            sessions=len(self.visa),
+            running_jobs=self.jobs.running(),
+            pending_requests=len(self._tasks),
+        )
+
     async def _execute_job(
-        self, identity: str, job_data: dict
+        self,
+        identity: str,
+        job_data: dict,
+        peer: typing.Optional[str] = None,
     ) -> typing.Optional[typing.Any]:
         """Execute pyvisa job data.
 
@@ -175,18 +486,39 @@ class RpcProcessor(ProcessorInterface):
             res = await self._getattr_wrapper(identity, job_data)
         elif job_data["action"] == "setattr":
             res = await self._setattr_wrapper(identity, job_data)
+        elif job_data["action"] == "register_macro":
+            res = await self._register_macro_wrapper(identity, job_data)
+        elif job_data["action"] == "run_macro":
+            res = await self._run_macro_wrapper(identity, job_data)
+        elif job_data["action"] == "execute":
+            res = await self._execute_wrapper(identity, job_data, peer)
+        elif job_data["action"] == "submit_job":
+            res = await self._submit_job_wrapper(identity, job_data)
+        elif job_data["action"] == "job_status":
+            res = self.jobs.get(job_data["name"], identity).status()
+        elif job_data["action"] == "job_result":
+            _, kwargs = self._get_args_and_kwargs(job_data)
+            res = await self.jobs.result(
+                job_data["name"], identity, kwargs.get("timeout")
+            )
+        elif job_data["action"] == "cancel_job":
+            res = self.jobs.cancel(job_data["name"], identity)
+        elif job_data["action"] == "list_jobs":
+            res = [job.status() for job in self.jobs.owned(identity)]
+        elif job_data["action"] == "stats":
+            res = self.stats()
+        elif job_data["action"] == "profile":
+            res = await self._profile_wrapper(job_data, peer)
+        elif job_data["action"] == "memory_snapshot":
+            res = await self._memory_snapshot_wrapper(job_data, peer)
         else:
             raise NotImplementedError("Action not supported.")
         return res
 
     async def _list_resources_wrapper(self, job_data):
-        """Wrap list_resources call."""
-        loop = asyncio.get_running_loop()
+        """Wrap list_resources call and merge the resources of all backends."""
         args, kwargs = self._get_args_and_kwargs(job_data)
-        instruments = await loop.run_in_executor(
-            None, lambda: self.rm.list_resources(*args, **kwargs)
-        )
-        return instruments
+        return await self.backends.list_resources(*args, **kwargs)
 
     async def _open_resource_wrapper(self, identity: str, job_data: dict):
         """Wrap open_resource call."""
@@ -202,32 +534,211 @@ class RpcProcessor(ProcessorInterface):
 
     async def _getattr_wrapper(self, identity: str, job_data: dict):
         """Wrap the getattr call."""
-        loop = asyncio.get_running_loop()
         visa = await self._get_visa_handle(identity)
-        attribute = await loop.run_in_executor(
-            None, getattr, visa, job_data["name"]
-        )
-        if callable(attribute):
+        args, kwargs = self._get_args_and_kwargs(job_data)
 
-            def call():
-                args, kwargs = self._get_args_and_kwargs(job_data)
+        def call():
+            attribute = getattr(visa, job_data["name"])
+            if callable(attribute):
                 return attribute(*args, **kwargs)
+            return attribute
 
-            res = await loop.run_in_executor(None, call)
-        else:
-            res = attribute
-        return res
+        return await self._run_on_handle(identity, call)
 
     async def _setattr_wrapper(self, identity: str, job_data: dict):
         """Wrap the setattr call."""
-        loop = asyncio.get_running_loop()
         visa = await self._get_visa_handle(identity)
-        await loop.run_in_executor(
-            None, setattr, visa, job_data["name"], job_data["value"]
+        await self._run_on_handle(
+            identity,
+            lambda: setattr(visa, job_data["name"], job_data["value"]),
         )
         res = None
         return res
 
+    async def _register_macro_wrapper(self, identity: str, job_data: dict):
+        """Store a named command sequence for the session."""
+        await self._get_visa_handle(identity)
+        steps = [
+            {
+                "name": step["name"],
+                "args": tuple(step.get("args") or ()),
+                "kwargs": dict(step.get("kwargs") or {}),
+                "capture": step.get("capture"),
+            }
+            for step in job_data["value"]
+        ]
+        self.macros.setdefault(identity, {})[job_data["name"]] = steps
+        return None
+
+    async def _run_macro_wrapper(self, identity: str, job_data: dict):
+        """Run a stored command sequence with the given parameters.
+
+        Placeholders like ``{freq}`` in string arguments are replaced by the
+        job keyword arguments. The results of all steps with a ``capture``
+        key are returned as dictionary.
+        """
+        visa = await self._get_visa_handle(identity)
+        try:
+            steps = self.macros[identity][job_data["name"]]
+        except KeyError:
+            raise KeyError(f"Macro {job_data['name']} is not registered.")
+        _, params = self._get_args_and_kwargs(job_data)
+
+        def run():
+            results = {}
+            for step in steps:
+                args = _substitute(step["args"], params)
+                kwargs = _substitute(step["kwargs"], params)
+                attribute = getattr(visa, step["name"])
+                if callable(attribute):
+                    res = attribute(*args, **kwargs)
+                else:
+                    res = attribute
+                if step["capture"] is not None:
+                    results[step["capture"]] = res
+            return results
+
+        return await self._run_on_handle(identity, run)
+
+    async def _execute_wrapper(
+        self,
+        identity: str,
+        job_data: dict,
+        peer: typing.Optional[str] = None,
+    ):
+        """Run a shipped callable with the session handle at server side.
+
+        The callable is called as ``func(resource, *args, **kwargs)`` on a
+        dedicated executor. Only clients whose transport peer address matches
+        a pattern of the execution allowlist are permitted. A callable which
+        exceeds the timeout is not interrupted and keeps running on the
+        executor with the resource handle.
+        """
+        if (
+            self._execute_executor is None
+            or peer is None
+            or not any(
+                fnmatch.fnmatch(peer, pattern)
+                for pattern in self.execute_allowlist
+            )
+        ):
+            raise PermissionError(
+                f"Remote execution is not permitted for {peer}."
+            )
+        visa = await self._get_visa_handle(identity)
+        func = pickle.loads(job_data["value"])
+        args, kwargs = self._get_args_and_kwargs(job_data)
+        return await self._run_on_handle(
+            identity,
+            lambda: func(visa, *args, **kwargs),
+            self._execute_executor,
+            self.execute_timeout,
+        )
+
+    def _authorize_admin(
+        self, job_data: dict, peer: typing.Optional[str]
+    ) -> typing.Dict[str, typing.Any]:
+        """Check access to admin actions and return the remaining kwargs.
+
+        Admin actions are permitted for local clients and for clients which
+        pass the admin token as ``token`` keyword argument.
+        """
+        _, kwargs = self._get_args_and_kwargs(job_data)
+        kwargs = dict(kwargs)
+        token = kwargs.pop("token", None)
+        if peer in (LOCAL_PEER, "::1"):
+            return kwargs
+        if (
+            self.admin_token is not None
+            and isinstance(token, str)
+            and hmac.compare_digest(token, self.admin_token)
+        ):
+            return kwargs
+        raise PermissionError(f"Admin actions are not permitted for {peer}.")
+
+    async def _profile_wrapper(
+        self, job_data: dict, peer: typing.Optional[str]
+    ) -> str:
+        """Profile the server for a duration and return the report."""
+        kwargs = self._authorize_admin(job_data, peer)
+        return await profile(**kwargs)
+
+    async def _memory_snapshot_wrapper(
+        self, job_data: dict, peer: typing.Optional[str]
+    ) -> typing.List[str]:
+        """Compare a tracemalloc snapshot to the previous one.
+
+        With ``stop=True``, tracing is stopped and nothing is returned.
+        """
+        kwargs = self._authorize_admin(job_data, peer)
+        if kwargs.pop("stop", False):
+            self.memory.stop()
+            return []
+        return self.memory.snapshot(**kwargs)
+
+    async def _submit_job_wrapper(self, identity: str, job_data: dict):
+        """Run a getattr call as job and return the job ID immediately."""
+        await self._get_visa_handle(identity)
+        job = self.jobs.submit(
+            identity,
+            job_data["name"],
+            lambda: self._getattr_wrapper(identity, job_data),
+        )
+        return {
+            "job_id": job.id,
+            "events_port": self.jobs.events_port,
+            "events_endpoint": self.jobs.events_endpoint,
+        }
+
+    async def _run_on_handle(
+        self,
+        identity: str,
+        func: typing.Callable[[], typing.Any],
+        executor: typing.Optional[ThreadPoolExecutor] = None,
+        timeout: typing.Optional[float] = None,
+    ) -> typing.Any:
+        """Run a blocking call on the session handle in an executor.
+
+        Calls on the same handle are serialized. The handle stays locked
+        until the executor call returns, even if the caller timed out or was
+        cancelled in the meantime. Calls run on the executor of the backend
+        of the handle unless another executor is given.
+        """
+        loop = asyncio.get_running_loop()
+        lock = self._handle_locks[identity]
+        request_trace = current_trace.get()
+        queued = time.perf_counter()
+        self.metrics.handle_queue += 1
+        try:
+            await lock.acquire()
+        finally:
+            self.metrics.handle_queue -= 1
+
+        def run():
+            self.metrics.dequeue()
+            started = time.perf_counter()
+            try:
+                return func()
+            finally:
+                if request_trace is not None:
+                    request_trace.span("queue", queued, started)
+                    request_trace.span("execute", started, time.perf_counter())
+
+        self.metrics.enqueue()
+        try:
+            future = loop.run_in_executor(
+                executor or self._handle_backends[identity].executor, run
+            )
+        except BaseException:
+            self.metrics.dequeue()
+            lock.release()
+            raise
+        future.add_done_callback(lambda _: lock.release())
+        job = current_job.get()
+        if job is not None:
+            job.active = future
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
     def _get_args_and_kwargs(
         self, job_data: dict
     ) -> typing.Tuple[
@@ -254,8 +765,12 @@ class RpcProcessor(ProcessorInterface):
         return self.visa[identity][0]
 
     async def _create_visa_handle(self, identity: str, *args, **kwargs):
-        """Create a VISA handle with given resource, args and kwargs."""
+        """Create a VISA handle with given resource, args and kwargs.
+
+        The keyword argument ``backend`` selects the backend explicitly.
+        """
         loop = asyncio.get_running_loop()
+        backend = self.backends.select(args[0], kwargs.pop("backend", None))
         or_kwargs = {}
         or_kwargs["access_mode"] = kwargs.pop(
             "access_mode", pyvisa.constants.AccessModes.no_lock
@@ -266,25 +781,27 @@ class RpcProcessor(ProcessorInterface):
         or_kwargs["resource_pyclass"] = kwargs.pop("resource_pyclass", None)
         self.visa[identity] = [
             await loop.run_in_executor(
-                None,
-                lambda: self.rm.open_resource(*args, **or_kwargs),
+                backend.executor,
+                lambda: backend.rm.open_resource(*args, **or_kwargs),
             ),
             time.time(),
         ]
+        self._handle_locks[identity] = asyncio.Lock()
+        self._handle_backends[identity] = backend
         for key, value in kwargs.items():
             await loop.run_in_executor(
-                None, setattr, self.visa[identity][0], key, value
+                backend.executor, setattr, self.visa[identity][0], key, value
             )
 
     async def _delete_visa_handle(self, identity: str, *args, **kwargs):
         """Close a VISA handle and delete it from storage."""
-        loop = asyncio.get_running_loop()
         handle = self.visa[identity][0]
-        await loop.run_in_executor(
-            None,
-            handle.close,
-        )
+        self.jobs.cancel_owned(identity)
+        await self._run_on_handle(identity, handle.close)
         del self.visa[identity]
+        del self._handle_locks[identity]
+        del self._handle_backends[identity]
+        self.macros.pop(identity, None)
 
 
 class ProxyServer:
@@ -295,24 +812,138 @@ class ProxyServer:
         port: int,
         rpc_port: typing.Optional[int] = None,
         backend: str = "",
+        execute_allowlist: typing.Optional[typing.Sequence[str]] = None,
+        execute_timeout: typing.Optional[float] = 60.0,
+        max_jobs: typing.Optional[int] = None,
+        job_result_ttl: float = 600.0,
+        single_port: bool = False,
+        ipc: bool = True,
+        inproc: typing.Optional[str] = None,
+        metrics_port: typing.Optional[int] = None,
+        admin_token: typing.Optional[str] = None,
+        slow_threshold: typing.Optional[float] = None,
+        slow_resource_thresholds: typing.Optional[
+            typing.Dict[str, float]
+        ] = None,
+        slow_log_rate: float = 60.0,
     ):
-        """Initialize proxy server."""
+        """Initialize proxy server.
+
+        :param port: synchronization port
+        :type port: int
+        :param rpc_port: RPC port, defaults to a random port
+        :type rpc_port: typing.Optional[int]
+        :param backend: PyVISA backend or comma-separated backends with
+            optional resource name patterns like ``ASRL*|USB*=@py,@ivi``,
+            defaults to ""
+        :type backend: str
+        :param execute_allowlist: client IP address patterns which may execute
+            shipped callables at server side, defaults to None (disabled)
+        :type execute_allowlist: typing.Optional[typing.Sequence[str]]
+        :param execute_timeout: timeout in seconds for shipped callables,
+            defaults to 60.0
+        :type execute_timeout: typing.Optional[float]
+        :param max_jobs: maximum number of running jobs, defaults to None
+        :type max_jobs: typing.Optional[int]
+        :param job_result_ttl: seconds to keep finished job results,
+            defaults to 600.0
+        :type job_result_ttl: float
+        :param single_port: serve synchronization and RPC on ``port``,
+            defaults to False. The job event publisher keeps its own port.
+        :type single_port: bool
+        :param ipc: additionally bind the RPC channel to an ipc:// endpoint
+            for clients on the same node, defaults to True
+        :type ipc: bool
+        :param inproc: name of an embedded server which is bound to
+            inproc:// endpoints only, defaults to None. ``port`` is ignored.
+        :type inproc: typing.Optional[str]
+        :param metrics_port: local port of an HTTP endpoint which serves the
+            request metrics in the Prometheus text format, defaults to None
+        :type metrics_port: typing.Optional[int]
+        :param admin_token: token which permits remote clients to use the
+            profiling actions, defaults to None (local clients only)
+        :type admin_token: typing.Optional[str]
+        :param slow_threshold: log requests which take longer than this
+            number of seconds, defaults to None
+        :type slow_threshold: typing.Optional[float]
+        :param slow_resource_thresholds: slow request thresholds by resource
+            name pattern which take precedence, defaults to None
+        :type slow_resource_thresholds: typing.Optional[typing.Dict[str,
+            float]]
+        :param slow_log_rate: maximum number of slow request log entries per
+            minute, defaults to 60.0
+        :type slow_log_rate: float
+        """
         self._stop = Event()
-        if port == rpc_port:
+        self._stopped = Event()
+        self._loop_thread: typing.Optional[int] = None
+        if single_port:
+            if rpc_port is not None and rpc_port != port:
+                raise ValueError(
+                    "RPC port has to be omitted in single port mode"
+                )
+            rpc_port = port
+        elif port == rpc_port:
             raise ValueError(
                 "Synchronization and RPC port should not be identical"
             )
-        self._poller = zmq.Poller()
+        self._poller = zmq.asyncio.Poller()
+        self._backend = backend
+        self._metrics_port = metrics_port
         self._rpc_processor: typing.Optional[RpcProcessor] = RpcProcessor(
-            backend, rpc_port
+            backend,
+            rpc_port,
+            execute_allowlist,
+            execute_timeout,
+            max_jobs,
+            job_result_ttl,
+            ipc,
+            inproc,
+            admin_token,
+            SlowRequestLog(
+                slow_threshold, slow_resource_thresholds, slow_log_rate
+            ),
         )
-        self._sync_processor: typing.Optional[SynchronizationProcessor] = (
-            SynchronizationProcessor(
-                port, self._rpc_processor.port, backend, VERSION
+        self._poller.register(self._rpc_processor.socket, zmq.POLLIN)
+        self._sync_processor: typing.Optional[SynchronizationProcessor] = None
+        if not single_port:
+            self._sync_processor = SynchronizationProcessor(
+                port,
+                self._rpc_processor.port,
+                backend,
+                VERSION,
+                None if inproc is None else inproc_endpoint(inproc, "sync"),
+                self._rpc_processor.endpoints,
             )
+            self._poller.register(self._sync_processor.socket, zmq.POLLIN)
+
+    @classmethod
+    def embedded(
+        cls, name: str = "embedded", backend: str = "", **kwargs
+    ) -> "ProxyServer":
+        """Start an in-process server which is reachable via inproc:// only.
+
+        Clients in the same process connect with the resource manager
+        ``ResourceManager(f"inproc:{name}@proxy")``.
+
+        :param name: name of the embedded server, defaults to "embedded"
+        :type name: str
+        :param backend: PyVISA backend, defaults to ""
+        :type backend: str
+        :return: running server
+        :rtype: ProxyServer
+        """
+        server = cls(0, backend=backend, inproc=name, **kwargs)
+        server.start()
+        return server
+
+    def start(self) -> Thread:
+        """Run server in a daemon thread."""
+        thread = Thread(
+            target=self.run, name="pyvisa-proxy-server", daemon=True
         )
-        self._poller.register(self._rpc_processor.socket, zmq.POLLIN)
-        self._poller.register(self._sync_processor.socket, zmq.POLLIN)
+        thread.start()
+        return thread
 
     def __enter__(self):
         """Context manager initialization implementation."""
@@ -329,6 +960,14 @@ class ProxyServer:
     def close(self):
         """Close sync-process, zmq connection and VISA handles."""
         self._stop.set()
+        loop_thread = getattr(self, "_loop_thread", None)
+        if loop_thread is not None and loop_thread != get_ident():
+            # Let the running event loop drain its requests first
+            self._stopped.wait(timeout=5)
+        self._close_processors()
+
+    def _close_processors(self):
+        """Close processors and their sockets."""
         if hasattr(self, "_rpc_processor") and self._rpc_processor is not None:
             self._rpc_processor.close()
             self._rpc_processor = None
@@ -343,44 +982,50 @@ class ProxyServer:
         """Run server with asyncio runner."""
         LOGGER.info("Starting PyVISA Proxy Server.")
         LOGGER.info(f"PyVISA-proxy version: {VERSION}")
-        backend = typing.cast(
-            SynchronizationProcessor, self._sync_processor
-        ).backend
-        if backend != "":
-            LOGGER.info(f"PyVISA backend: {backend}")
-        sync_port = typing.cast(
-            SynchronizationProcessor, self._sync_processor
-        ).port
-        LOGGER.info(f"Synchronization port: " f"{sync_port}")
-        LOGGER.info(
-            f"RPC port: {typing.cast(RpcProcessor, self._rpc_processor).port}"
-        )
-        asyncio.run(self._run())
+        if self._backend != "":
+            LOGGER.info(f"PyVISA backend: {self._backend}")
+        rpc_port = typing.cast(RpcProcessor, self._rpc_processor).port
+        if self._sync_processor is not None:
+            LOGGER.info(f"Synchronization port: {self._sync_processor.port}")
+            LOGGER.info(f"RPC port: {rpc_port}")
+        else:
+            LOGGER.info(f"Synchronization and RPC port: {rpc_port}")
+        self._loop_thread = get_ident()
+        try:
+            asyncio.run(self._run())
+        finally:
+            self._loop_thread = None
+            self._stopped.set()
 
     async def _run(self):
         """Async runner."""
+        metrics_server = None
+        try:
+            if self._metrics_port is not None:
+                rpc_processor = typing.cast(RpcProcessor, self._rpc_processor)
+                metrics_server = await serve_prometheus(
+                    rpc_processor.stats, self._metrics_port
+                )
+                LOGGER.info(f"Metrics port: {self._metrics_port}")
+            await self._serve()
+        finally:
+            if metrics_server is not None:
+                metrics_server.close()
+                await metrics_server.wait_closed()
+            if self._rpc_processor is not None:
+                await self._rpc_processor.shutdown()
+            self._close_processors()
+
+    async def _serve(self):
+        """Poll sockets and dispatch incoming calls."""
         while not self._stop.is_set():
-            socks = dict(self._poller.poll(100))
-            if (
-                typing.cast(
-                    SynchronizationProcessor, self._sync_processor
-                ).socket
-                in socks
-                and socks[
-                    typing.cast(
-                        SynchronizationProcessor, self._sync_processor
-                    ).socket
-                ]
-                == zmq.POLLIN
-            ):
-                await typing.cast(
-                    SynchronizationProcessor, self._sync_processor
-                ).call()
+            socks = dict(await self._poller.poll(100))
+            sync_processor = self._sync_processor
             if (
-                typing.cast(RpcProcessor, self._rpc_processor).socket in socks
-                and socks[
-                    typing.cast(RpcProcessor, self._rpc_processor).socket
-                ]
-                == zmq.POLLIN
+                sync_processor is not None
+                and socks.get(sync_processor.socket) == zmq.POLLIN
             ):
-                await typing.cast(RpcProcessor, self._rpc_processor).call()
+                await sync_processor.call()
+            rpc_processor = typing.cast(RpcProcessor, self._rpc_processor)
+            if socks.get(rpc_processor.socket) == zmq.POLLIN:
+                await rpc_processor.call()
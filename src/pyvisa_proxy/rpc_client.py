@@ -6,6 +6,7 @@
 
 import logging
 import platform
+import time
 import typing
 import uuid
 
@@ -14,6 +15,8 @@ import zmq
 from six import reraise
 
 from ._version_handling import get_version
+from .hooks import RequestHook, request_hooks
+from .tracing import publish, tracing_active
 
 VERSION = get_version()
 LOGGER = logging.getLogger(__name__)
@@ -22,19 +25,46 @@ LOGGER = logging.getLogger(__name__)
 class RpcClient(object):
     """PyVISA remote proxy resource which takes care of outgoing VISA calls."""
 
-    def __init__(self, host: str, rpc_port: int):
-        """Initialize RPC client."""
+    def __init__(
+        self, host: str, rpc_port: int, endpoint: typing.Optional[str] = None
+    ):
+        """Initialize RPC client.
+
+        :param host: host of the proxy server
+        :type host: str
+        :param rpc_port: RPC port of the proxy server
+        :type rpc_port: int
+        :param endpoint: zmq endpoint which replaces the TCP connection to
+            ``host:rpc_port``, e.g. ipc:// or inproc://, defaults to None
+        :type endpoint: typing.Optional[str]
+        """
+        self._host = host
         self._rpc_port = rpc_port
         self._identity = f"{platform.node()}.{uuid.uuid4()}"
         self._ctx = zmq.Context.instance()
         self._socket = self._ctx.socket(zmq.REQ)  # pylint: disable=E1101
         self._socket.identity = self._identity.encode()
-        self._socket.connect(f"tcp://{host}:{self._rpc_port}")
+        self._endpoint = endpoint or f"tcp://{host}:{self._rpc_port}"
+        self._socket.connect(self._endpoint)
+        #: Name of the resource which is accessed by the client
+        self.resource: typing.Optional[str] = None
+        #: Hooks which are called around the requests of this client
+        self.hooks: typing.List[RequestHook] = []
 
     def __del__(self) -> None:
         """Clean up on garbage collection."""
         return self.close()
 
+    @property
+    def host(self) -> str:
+        """Host of the proxy server."""
+        return self._host
+
+    @property
+    def endpoint(self) -> str:
+        """Endpoint of the RPC channel."""
+        return self._endpoint
+
     def close(self) -> None:
         """Close zmq connection."""
         self._socket.close()
@@ -47,6 +77,7 @@ class RpcClient(object):
         args: tuple = (),
         value=None,
         kwargs: dict = {},
+        trace: bool = False,
     ) -> typing.Any:
         """Send request via zmq to server.
 
@@ -56,6 +87,11 @@ class RpcClient(object):
         :type action: str
         :param value: Value for __setattr__, defaults to None
         :type value: Any, optional
+        :param trace: request the timing of the server phases and pass it
+            to the active tracers, defaults to False. Requests are traced
+            anyway within :func:`pyvisa_proxy.tracing.trace` or while a trace
+            hook is registered.
+        :type trace: bool
         :raises Exception: reraise Exception from server at client side
         :return: Any provided value
         :rtype: Any
@@ -67,8 +103,44 @@ class RpcClient(object):
             "args": args,
             "kwargs": kwargs,
         }
-        self._socket.send(pickle.dumps(message))
-        rep = pickle.loads(self._socket.recv())
+        trace = trace or tracing_active()
+        hooks = self.hooks + request_hooks()
+        if trace:
+            message["trace"] = True
+        begin = time.perf_counter()
+        request = pickle.dumps(message)
+        if hooks:
+            info: typing.Dict[str, typing.Any] = {
+                "resource": self.resource,
+                "action": action,
+                "name": name,
+                "args": args,
+                "kwargs": kwargs,
+                "bytes_sent": len(request),
+            }
+            for hook in hooks:
+                hook.before_request(info)
+        self._socket.send(request)
+        sent = time.perf_counter()
+        frames = self._socket.recv_multipart()
+        received = time.perf_counter()
+        rep = pickle.loads(frames[0])
+        if trace:
+            server = pickle.loads(frames[1]) if len(frames) > 1 else []
+            publish(
+                name,
+                action,
+                (begin, sent, received, time.perf_counter()),
+                server,
+            )
+        if hooks:
+            info.update(
+                duration=time.perf_counter() - begin,
+                bytes_received=sum(len(frame) for frame in frames),
+                failed="exception" in rep,
+            )
+            for hook in hooks:
+                hook.after_request(info)
         if "exception" in rep:
             # Unfortunately, no simple and lightweight solution"
             # https://stackoverflow.com/a/45241491
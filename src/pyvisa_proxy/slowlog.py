@@ -0,0 +1,140 @@
+"""Rate-limited log of slow requests of the PyVISA-proxy server.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import fnmatch
+import logging
+import time
+import typing
+
+LOGGER = logging.getLogger(__name__)
+
+
+def describe(value: typing.Any) -> str:
+    """Summarize a value by its type and size instead of its content."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        if len(value) > 3:
+            return f"{type(value).__name__}[{len(value)}]"
+        items = ", ".join(describe(item) for item in value)
+        return f"{type(value).__name__}({items})"
+    if isinstance(value, dict):
+        items = ", ".join(
+            f"{key}={describe(item)}" for key, item in value.items()
+        )
+        return f"dict({items})"
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    return type(value).__name__
+
+
+def describe_request(job_data: typing.Any) -> str:
+    """Summarize a request without formatting its payload."""
+    if not isinstance(job_data, dict):
+        return describe(job_data)
+    return (
+        f"{job_data.get('action')} {job_data.get('name')}"
+        f"(args={describe(job_data.get('args'))}, "
+        f"kwargs={describe(job_data.get('kwargs'))}, "
+        f"value={describe(job_data.get('value'))})"
+    )
+
+
+class SlowRequestLog(object):
+    """Log requests which exceed a latency threshold.
+
+    Thresholds can be set per resource name pattern, the first matching
+    pattern wins. At most ``rate`` entries are logged per minute, suppressed
+    entries are counted in the next one.
+    """
+
+    def __init__(
+        self,
+        threshold: typing.Optional[float] = None,
+        resource_thresholds: typing.Optional[typing.Dict[str, float]] = None,
+        rate: float = 60.0,
+    ):
+        """Initialize slow request log.
+
+        :param threshold: seconds above which requests are logged, defaults
+            to None (only resources with a threshold are logged)
+        :type threshold: typing.Optional[float]
+        :param resource_thresholds: thresholds by resource name pattern,
+            defaults to None
+        :type resource_thresholds: typing.Optional[typing.Dict[str, float]]
+        :param rate: maximum number of entries per minute, defaults to 60.0
+        :type rate: float
+        """
+        self.threshold = threshold
+        self.resource_thresholds = dict(resource_thresholds or {})
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self.suppressed = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if any threshold is set."""
+        return self.threshold is not None or bool(self.resource_thresholds)
+
+    def threshold_for(self, resource: str) -> typing.Optional[float]:
+        """Get the threshold which applies to a resource."""
+        for pattern, threshold in self.resource_thresholds.items():
+            if fnmatch.fnmatch(resource, pattern):
+                return threshold
+        return self.threshold
+
+    def _acquire(self) -> bool:
+        """Take a token of the rate limit."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate, self._tokens + (now - self._updated) * self.rate / 60
+        )
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def observe(
+        self,
+        seconds: float,
+        identity: str,
+        resource: str,
+        job_data: typing.Any,
+        request_size: int,
+        reply_size: int,
+        phases: typing.Sequence[typing.Tuple[str, float, float]] = (),
+    ) -> bool:
+        """Log a request if it exceeded its threshold.
+
+        :return: True if the request has been logged
+        :rtype: bool
+        """
+        threshold = self.threshold_for(resource)
+        if threshold is None or seconds < threshold:
+            return False
+        if not self._acquire():
+            self.suppressed += 1
+            return False
+        timings = " ".join(
+            f"{name}={(end - start) * 1e3:.2f}ms"
+            for name, start, end in phases
+        )
+        suppressed, self.suppressed = self.suppressed, 0
+        LOGGER.warning(
+            "Slow request %.1f ms from %s on %s: %s, %d bytes in, "
+            "%d bytes out, %s%s",
+            seconds * 1e3,
+            identity,
+            resource or "-",
+            describe_request(job_data),
+            request_size,
+            reply_size,
+            timings or "no phases",
+            f" ({suppressed} suppressed)" if suppressed else "",
+        )
+        return True
@@ -0,0 +1,180 @@
+"""Per-request timing breakdown of PyVISA-proxy calls.
+
+At server side, a :class:`RequestTrace` collects the phases of a traced
+request. At client side, a :class:`Tracer` combines them with the client
+timestamps and exports all traced requests in the Chrome trace format.
+
+:copyright: 2022 by PyVISA-proxy Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import typing
+
+#: Server phases of a request in the order of their occurrence
+SERVER_PHASES = ("receive", "decode", "validate", "queue", "execute", "encode")
+
+#: Request trace of the current asyncio task at server side
+current_trace: "contextvars.ContextVar[typing.Optional[RequestTrace]]" = (
+    contextvars.ContextVar("current_trace", default=None)
+)
+
+_active_tracer: "contextvars.ContextVar[typing.Optional[Tracer]]" = (
+    contextvars.ContextVar("active_tracer", default=None)
+)
+_hooks: typing.List[typing.Callable[[typing.Dict[str, typing.Any]], None]] = []
+
+
+class RequestTrace(object):
+    """Phases of a single request at server side.
+
+    The phases are stored as ``(name, start, end)`` in seconds relative to
+    the reception of the request.
+    """
+
+    def __init__(self, received: float):
+        """Initialize trace with the perf_counter value of the reception."""
+        self.received = received
+        self.spans: typing.List[typing.Tuple[str, float, float]] = []
+
+    def span(self, name: str, start: float, end: float):
+        """Add a phase from perf_counter values."""
+        self.spans.append((name, start - self.received, end - self.received))
+
+
+class Tracer(object):
+    """Collect traced requests of a client."""
+
+    def __init__(self):
+        """Initialize tracer."""
+        self.records: typing.List[typing.Dict[str, typing.Any]] = []
+
+    def __call__(self, record: typing.Dict[str, typing.Any]):
+        """Add a traced request."""
+        self.records.append(record)
+
+    def chrome_trace(self) -> typing.Dict[str, typing.Any]:
+        """Export the traced requests in the Chrome trace event format.
+
+        The result can be loaded with chrome://tracing or Perfetto.
+        """
+        events = []
+        for record in self.records:
+            label = f"{record['action']} {record['name'] or ''}".strip()
+            origin = record["timestamp"] * 1e6
+            for process, spans in (
+                ("client", record["client"]),
+                ("server", record["server"]),
+            ):
+                for name, start, end in spans:
+                    events.append(
+                        {
+                            "name": name,
+                            "cat": label,
+                            "ph": "X",
+                            "ts": origin + start * 1e6,
+                            "dur": (end - start) * 1e6,
+                            "pid": process,
+                            "tid": record["thread"],
+                        }
+                    )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: typing.Union[str, os.PathLike]):
+        """Write the Chrome trace of all traced requests to a file."""
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.chrome_trace(), fp)
+
+
+@contextlib.contextmanager
+def trace() -> typing.Iterator[Tracer]:
+    """Trace all requests of the current thread within the context.
+
+    .. code-block:: python
+
+        with trace() as tracer:
+            instr.query("*IDN?")
+        tracer.dump("query.json")
+    """
+    tracer = Tracer()
+    token = _active_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active_tracer.reset(token)
+
+
+def add_trace_hook(
+    hook: typing.Callable[[typing.Dict[str, typing.Any]], None],
+):
+    """Call ``hook`` with the record of every traced request.
+
+    All requests are traced while a hook is registered.
+    """
+    _hooks.append(hook)
+
+
+def remove_trace_hook(
+    hook: typing.Callable[[typing.Dict[str, typing.Any]], None],
+):
+    """Remove a hook which has been added by :func:`add_trace_hook`."""
+    _hooks.remove(hook)
+
+
+def tracing_active() -> bool:
+    """Return True if requests of the current thread are traced."""
+    return bool(_hooks) or _active_tracer.get() is not None
+
+
+def publish(
+    name: typing.Optional[str],
+    action: str,
+    client: typing.Sequence[float],
+    server: typing.Sequence[typing.Sequence],
+):
+    """Combine client and server timestamps and pass them to the tracers.
+
+    The server phases are placed in the middle of the round trip since the
+    clocks of client and server are not synchronized.
+
+    :param name: attribute name of the request
+    :type name: typing.Optional[str]
+    :param action: action of the request
+    :type action: str
+    :param client: perf_counter values before encoding, after sending,
+        after receiving and after decoding the reply
+    :type client: typing.Sequence[float]
+    :param server: server phases relative to the reception of the request
+    :type server: typing.Sequence[typing.Sequence]
+    """
+    begin, sent, received, decoded = client
+    offset = 0.0
+    if server:
+        duration = max(end for _, _, end in server)
+        offset = sent + max(0.0, (received - sent - duration) / 2) - begin
+    record = {
+        "name": name,
+        "action": action,
+        "timestamp": time.time() - (time.perf_counter() - begin),
+        "thread": threading.get_ident(),
+        "round_trip": received - sent,
+        "client": [
+            ("encode+send", 0.0, sent - begin),
+            ("wait", sent - begin, received - begin),
+            ("decode", received - begin, decoded - begin),
+        ],
+        "server": [
+            (phase, offset + start, offset + end)
+            for phase, start, end in server
+        ],
+    }
+    tracer = _active_tracer.get()
+    if tracer is not None:
+        tracer(record)
+    for hook in list(_hooks):
+        hook(record)
@@ -45,3 +45,64 @@ def test_parsing(
     assert args.port == port_val
     assert args.rpc_port == rpc_port_val
     assert args.backend == backend_val
+
+
+def test_parsing_execute_options():
+    args = parse_arguments(
+        ["--allow-execute", "10.0.0.*", "--allow-execute", "127.0.0.1"]
+    )
+    assert args.execute_allowlist == ["10.0.0.*", "127.0.0.1"]
+    assert args.execute_timeout == 60.0
+    args = parse_arguments(["--execute-timeout", "5"])
+    assert args.execute_allowlist == []
+    assert args.execute_timeout == 5.0
+
+
+def test_parsing_job_options():
+    args = parse_arguments([])
+    assert args.max_jobs is None
+    assert args.job_result_ttl == 600.0
+    args = parse_arguments(["--max-jobs", "4", "--job-ttl", "60"])
+    assert args.max_jobs == 4
+    assert args.job_result_ttl == 60.0
+
+
+def test_parsing_single_port():
+    assert not parse_arguments([]).single_port
+    assert parse_arguments(["--single-port"]).single_port
+
+
+def test_parsing_no_ipc():
+    assert parse_arguments([]).ipc
+    assert not parse_arguments(["--no-ipc"]).ipc
+
+
+def test_parsing_metrics_port():
+    assert parse_arguments([]).metrics_port is None
+    assert parse_arguments(["--metrics-port", "9100"]).metrics_port == 9100
+
+
+def test_parsing_admin_token():
+    assert parse_arguments([]).admin_token is None
+    assert parse_arguments(["--admin-token", "abc"]).admin_token == "abc"
+
+
+def test_parsing_slow_log():
+    args = parse_arguments([])
+    assert args.slow_threshold is None
+    assert args.slow_resource_thresholds == []
+    args = parse_arguments(
+        [
+            "--slow-threshold",
+            "0.5",
+            "--slow-resource",
+            "GPIB*=2",
+            "--slow-log-rate",
+            "5",
+        ]
+    )
+    assert args.slow_threshold == 0.5
+    assert args.slow_resource_thresholds == [("GPIB*", 2.0)]
+    assert args.slow_log_rate == 5.0
+    with pytest.raises(SystemExit):
+        parse_arguments(["--slow-resource", "GPIB*"])
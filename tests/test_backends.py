@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from pyvisa_proxy.backends import BackendRouter, parse_backends
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("", [("", [])]),
+        ("@sim", [("@sim", [])]),
+        (
+            "ASRL*|USB*=@py, GPIB*=@ivi,@sim",
+            [("@py", ["ASRL*", "USB*"]), ("@ivi", ["GPIB*"]), ("@sim", [])],
+        ),
+    ],
+)
+def test_parse_backends(spec, expected):
+    assert parse_backends(spec) == expected
+
+
+def test_parse_backends_twice():
+    with pytest.raises(ValueError):
+        parse_backends("ASRL*=@sim,@sim")
+
+
+def test_select(tmp_path):
+    path = tmp_path / "empty.yaml"
+    path.write_text('spec: "1.0"\ndevices: {}\nresources: {}\n')
+    router = BackendRouter(f"asrl*={path}@sim,@sim")
+    try:
+        serial, sim = router.backends.values()
+        assert router.default is serial
+        assert router.select("ASRL1::INSTR") is serial
+        assert router.select("ASRL1::INSTR", "@sim") is sim
+        # Unmatched resources are opened by the backend which listed them
+        assert router.select("GPIB0::8::INSTR") is serial
+        resources = asyncio.run(router.list_resources())
+        assert "GPIB0::8::INSTR" in resources
+        assert router.select("GPIB0::8::INSTR") is sim
+        with pytest.raises(ValueError):
+            router.select("GPIB0::8::INSTR", "@py")
+    finally:
+        router.close()
@@ -0,0 +1,47 @@
+import pytest
+
+from pyvisa_proxy.bench import parse_arguments, parse_mix, run, summarize
+
+
+def test_parse_mix():
+    assert parse_mix("query=8,write,read_raw=0.5") == {
+        "query": 8.0,
+        "write": 1.0,
+        "read_raw": 0.5,
+    }
+    with pytest.raises(ValueError):
+        parse_mix("query,delete")
+    with pytest.raises(ValueError):
+        parse_mix("query=0")
+
+
+def test_summarize():
+    samples = [("query", 0.001 * index, index == 10) for index in range(1, 11)]
+    samples.append(("write", 0.5, False))
+    report = summarize(samples, 2.0)
+    assert report["query"]["count"] == 10
+    assert report["query"]["throughput"] == 5.0
+    assert report["query"]["error_rate"] == 0.1
+    assert report["query"]["p50"] == 0.005
+    assert report["query"]["max"] == 0.01
+    assert report["total"]["count"] == 11
+
+
+def test_run_local():
+    args = parse_arguments(
+        [
+            "--local",
+            "--workers",
+            "2",
+            "--duration",
+            "0.5",
+            "--rate",
+            "20",
+            "--mix",
+            "query=3,attribute=1",
+        ]
+    )
+    report = run(args)
+    total = report["operations"]["total"]
+    assert 10 <= total["count"] <= 22
+    assert total["error_rate"] == 0.0
@@ -1,3 +1,8 @@
+import platform
+import subprocess
+import sys
+import time
+
 import dill as pickle
 import pytest
 import zmq
@@ -5,9 +10,13 @@ from pyvisa import ResourceManager
 
 from pyvisa_proxy import __version__
 from pyvisa_proxy.highlevel import (
+    _SYNC_CACHE,
     CompatibilityError,
     ProxyVisaLibrary,
+    cached_sync_up,
     check_for_version_compatibility,
+    clear_sync_cache,
+    rpc_endpoint,
     sync_up,
 )
 
@@ -61,3 +70,62 @@ def test_new_ProxyVisaLibrary_without_URL():
 def test_new_ProxyVisaLibrary(emulated_server_with_sync, sync_port):
     rm = ResourceManager(f"localhost:{sync_port}@proxy")
     assert isinstance(rm.visalib, ProxyVisaLibrary)
+
+
+def test_cached_sync_up(emulated_server_with_sync, rpc_port, sync_port):
+    clear_sync_cache()
+    reply = cached_sync_up("localhost", sync_port)
+    assert reply["rpc_port"] == rpc_port
+    assert reply["backend"] == "@py"
+    assert reply["version"] == __version__
+    # The emulated server replies only once
+    assert cached_sync_up("localhost", sync_port) == reply
+    clear_sync_cache()
+
+
+def test_cached_sync_up_stale(rpc_port, sync_port):
+    clear_sync_cache()
+    # Nothing listens at the cached RPC port anymore
+    _SYNC_CACHE[("localhost", str(sync_port))] = (
+        time.monotonic(),
+        {"rpc_port": rpc_port, "backend": "@py", "version": __version__},
+    )
+    with pytest.raises(TimeoutError):
+        cached_sync_up("localhost", sync_port, 1)
+    assert not _SYNC_CACHE
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ({"rpc_port": 5001}, "tcp://server:5001"),
+        (
+            {"rpc_port": 5001, "node": "other", "ipc": "ipc:///tmp/a.rpc"},
+            "tcp://server:5001",
+        ),
+        (
+            {"rpc_port": 0, "rpc_endpoint": "inproc://pyvisa-proxy.a.rpc"},
+            "inproc://pyvisa-proxy.a.rpc",
+        ),
+    ],
+)
+def test_rpc_endpoint(reply, expected):
+    assert rpc_endpoint("server", reply) == expected
+
+
+@pytest.mark.skipif(not zmq.has("ipc"), reason="ipc:// is not available")
+def test_rpc_endpoint_same_node():
+    reply = {"rpc_port": 5001, "node": platform.node(), "ipc": "ipc:///a"}
+    assert rpc_endpoint("server", reply) == "ipc:///a"
+
+
+def test_client_import_is_lightweight():
+    code = (
+        "import sys, pyvisa_proxy; "
+        "print(sorted({'pyvisa_proxy.proxy_server', 'jsonschema', "
+        "'zmq.asyncio', 'tblib'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True
+    ).stdout
+    assert output.strip() == b"[]"
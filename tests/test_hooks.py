@@ -0,0 +1,48 @@
+from pyvisa_proxy.hooks import RequestStats, request_hooks
+
+
+def request(name, args=(), resource="INSTR", duration=0.001):
+    return {
+        "resource": resource,
+        "action": "getattr",
+        "name": name,
+        "args": args,
+        "kwargs": {},
+        "bytes_sent": 10,
+        "duration": duration,
+        "bytes_received": 20,
+        "failed": False,
+    }
+
+
+def test_aggregate_calls():
+    stats = RequestStats()
+    stats.after_request(request("timeout"))
+    stats.after_request(request("timeout", duration=0.003))
+    stats.after_request(request("query", ("*IDN?",)))
+    assert stats.total_calls == 3
+    assert stats.calls[("getattr", "timeout")] == [2, 0.004, 20, 40]
+    report = stats.report().splitlines()
+    assert report[1].startswith("getattr       timeout")
+    assert not stats.repetitions
+
+
+def test_repetitions():
+    stats = RequestStats(repeat_threshold=3)
+    for _ in range(4):
+        stats.after_request(request("timeout"))
+    # Other resources and other arguments break a run
+    stats.after_request(request("timeout", resource="OTHER"))
+    stats.after_request(request("query", ("A",)))
+    stats.after_request(request("query", ("B",)))
+    stats.after_request(request("query", ("B",)))
+    assert stats.repetitions == {("INSTR", "getattr", "timeout"): [4, 4]}
+    assert "repeated: getattr timeout on INSTR 4 times" in stats.report()
+    stats.reset()
+    assert stats.total_calls == 0
+
+
+def test_context_registers_hook():
+    with RequestStats() as stats:
+        assert stats in request_hooks()
+    assert stats not in request_hooks()
@@ -1,3 +1,4 @@
+import json
 import time
 from multiprocessing import Process
 
@@ -7,7 +8,10 @@ from packaging.version import parse
 from pyvisa import ResourceManager
 
 from pyvisa_proxy import ProxyServer, run_server
+from pyvisa_proxy.hooks import RequestHook, RequestStats
+from pyvisa_proxy.proxy_job import wait
 from pyvisa_proxy.proxy_resource import ProxyResource
+from pyvisa_proxy.tracing import SERVER_PHASES, trace
 
 
 @pytest.mark.parametrize("static_rpc_port", [True, False])
@@ -75,3 +79,123 @@ def get_resource_and_test(
     resp = instr.query(query_string)
     assert resp == idn
     rm.close()
+
+
+def test_jobs(sync_port, resource_name, executor, idn_string, query_string):
+    with ProxyServer(sync_port, None, "@sim") as server:
+        executor.submit(server.run)
+        rm = ResourceManager(f"localhost:{sync_port}@proxy")
+        instr = rm.open_resource(resource_name)
+        job = instr.submit("query", query_string)
+        done, pending = wait([job], timeout=5)
+        assert done == {job}
+        assert not pending
+        assert job.done()
+        assert job.result(timeout=1) == idn_string
+        rm.close()
+        server.close()
+
+
+def test_macros(sync_port, resource_name, executor):
+    with ProxyServer(sync_port, None, "@sim") as server:
+        executor.submit(server.run)
+        rm = ResourceManager(f"localhost:{sync_port}@proxy")
+        instr = rm.open_resource(resource_name)
+        instr.register_macro(
+            "set_freq",
+            [
+                {"name": "query", "args": ["!FREQ {freq}"]},
+                {"name": "query", "args": ["?FREQ"], "capture": "freq"},
+                {"name": "timeout", "capture": "timeout"},
+            ],
+        )
+        res = instr.run_macro("set_freq", freq=42)
+        assert res["freq"].strip() == "42.00"
+        assert res["timeout"] == instr.timeout
+        rm.close()
+        server.close()
+
+
+def test_tracing(sync_port, resource_name, executor, query_string, tmp_path):
+    with ProxyServer(sync_port, None, "@sim") as server:
+        executor.submit(server.run)
+        rm = ResourceManager(f"localhost:{sync_port}@proxy")
+        instr = rm.open_resource(resource_name)
+        with trace() as tracer:
+            instr.query(query_string)
+        instr.query(query_string)
+        (record,) = tracer.records
+        assert record["action"] == "getattr"
+        assert record["name"] == "query"
+        phases = [name for name, _, _ in record["server"]]
+        assert phases == list(SERVER_PHASES)
+        for _, start, end in record["server"]:
+            assert 0 <= start <= end <= record["client"][-1][2]
+        tracer.dump(tmp_path / "trace.json")
+        events = json.loads((tmp_path / "trace.json").read_text())
+        assert len(events["traceEvents"]) == 3 + len(SERVER_PHASES)
+        rm.close()
+        server.close()
+
+
+def test_request_hooks(sync_port, resource_name, executor, query_string):
+    with ProxyServer(sync_port, None, "@sim") as server:
+        executor.submit(server.run)
+        rm = ResourceManager(f"localhost:{sync_port}@proxy")
+        instr = rm.open_resource(resource_name)
+        infos = []
+
+        class Hook(RequestHook):
+            def after_request(self, info):
+                infos.append(info)
+
+        hook = Hook()
+        instr.add_request_hook(hook)
+        with RequestStats() as stats:
+            for _ in range(3):
+                instr.timeout
+            instr.query(query_string)
+        instr.remove_request_hook(hook)
+        instr.timeout
+        assert [info["name"] for info in infos] == ["timeout"] * 3 + ["query"]
+        assert all(info["resource"] == resource_name for info in infos)
+        assert all(info["bytes_received"] > 0 for info in infos)
+        assert stats.total_calls == 4
+        assert (resource_name, "getattr", "timeout") in stats.repetitions
+        rm.close()
+        server.close()
+
+
+SERIAL_INSTRUMENTS = """spec: "1.0"
+devices:
+  serial:
+    eom:
+      ASRL INSTR:
+        q: "\\r\\n"
+        r: "\\n"
+    dialogues:
+      - q: "?IDN"
+        r: "SERIAL"
+resources:
+  ASRL1::INSTR:
+    device: serial
+"""
+
+
+def test_multiple_backends(sync_port, executor, tmp_path, query_string):
+    path = tmp_path / "serial.yaml"
+    path.write_text(SERIAL_INSTRUMENTS)
+    with ProxyServer(sync_port, None, f"ASRL*={path}@sim,@sim") as server:
+        executor.submit(server.run)
+        rm = ResourceManager(f"localhost:{sync_port}@proxy")
+        resources = rm.list_resources()
+        assert resources.count("ASRL1::INSTR") == 1
+        assert "GPIB0::8::INSTR" in resources
+        serial = rm.open_resource("ASRL1::INSTR")
+        assert serial.query(query_string) == "SERIAL"
+        gpib = rm.open_resource("GPIB0::8::INSTR")
+        assert gpib.query(query_string) != "SERIAL"
+        default = rm.open_resource("ASRL1::INSTR", backend="@sim")
+        assert default.query(query_string) != "SERIAL"
+        rm.close()
+        server.close()
@@ -0,0 +1,24 @@
+from pyvisa_proxy.metrics import Histogram, ServerMetrics, render_prometheus
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 2.65
+    assert list(snapshot["buckets"].values()) == [2, 3, 4]
+
+
+def test_render_prometheus():
+    metrics = ServerMetrics()
+    metrics.observe("getattr", "query", 'ASRL"1', 0.002)
+    metrics.observe("getattr", "query", 'ASRL"1', 0.2, failed=True)
+    text = render_prometheus(metrics.snapshot(sessions=2))
+    labels = 'action="getattr",name="query",resource="ASRL\\"1"'
+    assert f'pyvisa_proxy_request_seconds_bucket{{{labels},le="+Inf"}} 2' in (
+        text
+    )
+    assert f"pyvisa_proxy_request_errors_total{{{labels}}} 1" in text
+    assert "pyvisa_proxy_sessions 2" in text
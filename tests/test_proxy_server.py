@@ -1,15 +1,19 @@
 import asyncio
+import logging
 import platform
+import time
 import typing
+import urllib.request
 import uuid
 
 import dill as pickle
 import pytest
+import pyvisa
 import zmq
 from six import reraise
 
 from pyvisa_proxy import ProxyServer, __version__
-from pyvisa_proxy.proxy_server import SynchronizationProcessor
+from pyvisa_proxy.proxy_server import SynchronizationProcessor, _substitute
 
 
 class Dummy(object):
@@ -34,11 +38,16 @@ def create_message(
     return message
 
 
+@pytest.fixture
+def server_kwargs() -> dict:
+    return {}
+
+
 @pytest.fixture
 def proxy_server(
-    sync_port, run_infinite
+    sync_port, run_infinite, server_kwargs
 ) -> typing.Generator[ProxyServer, None, None]:
-    server = ProxyServer(sync_port, backend="@sim")
+    server = ProxyServer(sync_port, backend="@sim", **server_kwargs)
     run_infinite(server.run)
     yield server
     server.close()
@@ -72,6 +81,8 @@ def open_resource(proxy_resource, resource_name):
 
 def send_command(proxy_resource, message: dict):
     proxy_resource.send(pickle.dumps(message))
+    if not proxy_resource.poll(10000):
+        pytest.fail("Server did not reply in time.")
     rep = pickle.loads(proxy_resource.recv())
     if "exception" in rep:
         reraise(*pickle.loads(rep["exception"]))
@@ -161,3 +172,322 @@ def test_setattr(proxy_server, proxy_resource, resource_name):
         ].timeout
         == 1
     )
+
+
+def test_macro(proxy_server, proxy_resource, resource_name):
+    open_resource(proxy_resource, resource_name)
+    steps = [
+        {"name": "query", "args": ["!FREQ {freq}"]},
+        {"name": "query", "args": ["?FREQ"], "capture": "freq"},
+    ]
+    message = create_message("set_freq", "register_macro", value=steps)
+    assert send_command(proxy_resource, message) is None
+    message = create_message("set_freq", "run_macro", kwargs={"freq": 42})
+    rep = send_command(proxy_resource, message)
+    assert rep["freq"].strip() == "42.00"
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("FREQ {freq}", "FREQ 42"),
+        ("{freq}", 42),
+        (("{freq}", "DATA {1,2}"), (42, "DATA {1,2}")),
+        ({"delay": "{delay}"}, {"delay": 0.5}),
+        ("FMT {{freq}} {freq}", "FMT {freq} 42"),
+    ],
+)
+def test_substitute(value, expected):
+    assert _substitute(value, {"freq": 42, "delay": 0.5}) == expected
+
+
+def test_substitute_missing_parameter():
+    with pytest.raises(KeyError):
+        _substitute("FREQ {freq}", {})
+
+
+def test_unknown_macro(proxy_server, proxy_resource, resource_name):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("missing", "run_macro", kwargs={})
+    with pytest.raises(KeyError):
+        send_command(proxy_resource, message)
+
+
+def sweep(resource, frequencies):
+    results = []
+    for freq in frequencies:
+        resource.query(f"!FREQ {freq}")
+        results.append(float(resource.query("?FREQ")))
+    return max(results)
+
+
+@pytest.mark.parametrize(
+    "server_kwargs", [{"execute_allowlist": ["127.0.0.1"]}]
+)
+def test_execute(proxy_server, proxy_resource, resource_name):
+    open_resource(proxy_resource, resource_name)
+    message = create_message(
+        None,
+        "execute",
+        args=([10, 30, 20],),
+        value=pickle.dumps(sweep, recurse=True),
+    )
+    assert send_command(proxy_resource, message) == 30.0
+
+
+@pytest.mark.parametrize(
+    "server_kwargs", [{}, {"execute_allowlist": ["10.0.0.*"]}]
+)
+def test_execute_not_permitted(proxy_server, resource_name, ctx):
+    socket: zmq.Socket = ctx.socket(zmq.REQ)
+    # The client chosen socket identity must not grant any permission
+    socket.identity = b"10.0.0.1.spoofed"
+    try:
+        socket.connect(
+            f"tcp://localhost:{proxy_server._rpc_processor.port}"
+        )  # pylint: disable=W0212
+        open_resource(socket, resource_name)
+        message = create_message(
+            None, "execute", value=pickle.dumps(sweep, recurse=True)
+        )
+        with pytest.raises(PermissionError):
+            send_command(socket, message)
+    finally:
+        socket.close()
+
+
+def test_job(proxy_server, proxy_resource, resource_name):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("query", "submit_job", args=("?IDN",))
+    rep = send_command(proxy_resource, message)
+    job_id = rep["job_id"]
+    assert rep["events_port"] == proxy_server._rpc_processor.jobs.events_port
+    message = create_message(job_id, "job_result", kwargs={"timeout": 5})
+    assert send_command(proxy_resource, message).strip() == "LSG Serial #1234"
+    message = create_message(job_id, "job_status")
+    assert send_command(proxy_resource, message)["state"] == "done"
+    message = create_message(None, "list_jobs")
+    assert [
+        job["job_id"] for job in send_command(proxy_resource, message)
+    ] == [job_id]
+
+
+@pytest.mark.parametrize("server_kwargs", [{"max_jobs": 0}])
+def test_job_limit(proxy_server, proxy_resource, resource_name):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("query", "submit_job", args=("?IDN",))
+    with pytest.raises(RuntimeError):
+        send_command(proxy_resource, message)
+
+
+def test_unknown_job(proxy_server, proxy_resource):
+    message = create_message("unknown", "job_status")
+    with pytest.raises(KeyError):
+        send_command(proxy_resource, message)
+
+
+def test_job_owner(proxy_server, proxy_resource, resource_name, ctx):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("query", "submit_job", args=("?IDN",))
+    job_id = send_command(proxy_resource, message)["job_id"]
+    socket: zmq.Socket = ctx.socket(zmq.REQ)
+    socket.identity = str(uuid.uuid4()).encode()
+    try:
+        socket.connect(
+            f"tcp://localhost:{proxy_server._rpc_processor.port}"
+        )  # pylint: disable=W0212
+        assert send_command(socket, create_message(None, "list_jobs")) == []
+        for action in ("job_status", "job_result", "cancel_job"):
+            with pytest.raises(KeyError):
+                send_command(socket, create_message(job_id, action))
+    finally:
+        socket.close()
+
+
+def test_job_serialized_with_session(
+    proxy_server, proxy_resource, resource_name
+):
+    open_resource(proxy_resource, resource_name)
+    start = time.monotonic()
+    message = create_message(
+        "query", "submit_job", args=("?IDN",), kwargs={"delay": 0.5}
+    )
+    send_command(proxy_resource, message)
+    message = create_message("query", "getattr", args=("?IDN",))
+    send_command(proxy_resource, message)
+    # The call has to wait until the job released the resource handle
+    assert time.monotonic() - start >= 0.5
+
+
+def test_sync_up_pending_requests(ctx, rpc_port, sync_port):
+    sync_processor = SynchronizationProcessor(
+        sync_port, rpc_port, "@py", __version__
+    )
+    sockets = []
+    try:
+        for _ in range(3):
+            sync_socket: zmq.Socket = ctx.socket(zmq.REQ)
+            sync_socket.identity = str(uuid.uuid4()).encode()
+            sync_socket.connect(f"tcp://localhost:{sync_port}")
+            sync_socket.send(b"")
+            sockets.append(sync_socket)
+        # Wait until all requests are queued
+        time.sleep(0.2)
+        asyncio.run(sync_processor.call())
+        for sync_socket in sockets:
+            assert sync_socket.poll(1000)
+            rep = pickle.loads(sync_socket.recv())
+            assert rep["rpc_port"] == rpc_port
+    finally:
+        for sync_socket in sockets:
+            sync_socket.close()
+        sync_processor.close()
+
+
+def test_single_port(sync_port, run_infinite, ctx):
+    with pytest.raises(ValueError):
+        ProxyServer(sync_port, sync_port + 1, single_port=True)
+    server = ProxyServer(sync_port, backend="@sim", single_port=True)
+    run_infinite(server.run)
+    socket: zmq.Socket = ctx.socket(zmq.REQ)
+    socket.identity = str(uuid.uuid4()).encode()
+    try:
+        socket.connect(f"tcp://localhost:{sync_port}")
+        socket.send(b"")
+        assert socket.poll(5000)
+        rep = pickle.loads(socket.recv())
+        assert rep["rpc_port"] == sync_port
+        message = create_message(None, "list_resources")
+        assert isinstance(send_command(socket, message), tuple)
+    finally:
+        socket.close()
+        server.close()
+
+
+def test_generated_identity(proxy_server, ctx):
+    socket: zmq.Socket = ctx.socket(zmq.REQ)
+    # Let zmq generate a binary identity
+    try:
+        socket.connect(
+            f"tcp://localhost:{proxy_server._rpc_processor.port}"
+        )  # pylint: disable=W0212
+        message = create_message(None, "list_resources")
+        assert isinstance(send_command(socket, message), tuple)
+    finally:
+        socket.close()
+
+
+def test_embedded_server():
+    server = ProxyServer.embedded("test-embedded", "@sim")
+    try:
+        rm = pyvisa.ResourceManager("inproc:test-embedded@proxy")
+        assert rm.visalib._rpc_endpoint.startswith("inproc://")
+        resources = rm.list_resources()
+        inst = rm.open_resource(resources[0])
+        assert inst.query("?IDN")
+        inst.close()
+        rm.close()
+    finally:
+        server.close()
+
+
+@pytest.mark.skipif(not zmq.has("ipc"), reason="ipc:// is not available")
+def test_ipc_endpoint(sync_port, run_infinite, resource_name):
+    server = ProxyServer(
+        sync_port, backend="@sim", execute_allowlist=["127.0.0.1"]
+    )
+    run_infinite(server.run)
+    try:
+        rm = pyvisa.ResourceManager(f"localhost:{sync_port}@proxy")
+        assert rm.visalib._rpc_endpoint.startswith("ipc://")
+        inst = rm.open_resource(resource_name)
+        # ipc:// peers count as local clients
+        assert inst.execute(lambda res: res.resource_name) == resource_name
+        rm.close()
+    finally:
+        server.close()
+
+
+def test_stats(proxy_server, proxy_resource, resource_name, query_string):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("query", "getattr", args=(query_string,))
+    send_command(proxy_resource, message)
+    stats = send_command(proxy_resource, create_message(None, "stats"))
+    assert stats["sessions"] == 1
+    assert stats["bytes_in"] > 0 and stats["bytes_out"] > 0
+    assert stats["executor_queue"] == 0
+    (query,) = [
+        entry for entry in stats["requests"] if entry["name"] == "query"
+    ]
+    assert query["action"] == "getattr"
+    assert query["resource"] == resource_name
+    assert query["count"] == 1
+
+
+def test_metrics_port(sync_port, rpc_port, run_infinite):
+    server = ProxyServer(sync_port, backend="@sim", metrics_port=rpc_port)
+    run_infinite(server.run)
+    try:
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{rpc_port}/metrics", timeout=5
+                ) as response:
+                    body = response.read().decode()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        assert "pyvisa_proxy_sessions 0" in body
+    finally:
+        server.close()
+
+
+@pytest.mark.parametrize(
+    "mode, expected", [("sampling", "MainThread"), ("cprofile", "sleep")]
+)
+def test_profile(proxy_server, proxy_resource, mode, expected):
+    message = create_message(
+        None, "profile", kwargs={"duration": 0.2, "mode": mode}
+    )
+    assert expected in send_command(proxy_resource, message)
+
+
+def test_memory_snapshot(proxy_server, proxy_resource):
+    message = create_message(None, "memory_snapshot", kwargs={"limit": 5})
+    assert send_command(proxy_resource, message) == []
+    assert len(send_command(proxy_resource, message)) <= 5
+    message = create_message(None, "memory_snapshot", kwargs={"stop": True})
+    assert send_command(proxy_resource, message) == []
+
+
+@pytest.mark.parametrize("server_kwargs", [{"admin_token": "secret"}])
+def test_admin_authorization(proxy_server):
+    processor = proxy_server._rpc_processor  # pylint: disable=W0212
+    message = create_message(None, "profile", kwargs={"duration": 1})
+    assert processor._authorize_admin(message, "127.0.0.1") == {"duration": 1}
+    with pytest.raises(PermissionError):
+        processor._authorize_admin(message, "10.0.0.1")
+    message["kwargs"]["token"] = "wrong"
+    with pytest.raises(PermissionError):
+        processor._authorize_admin(message, "10.0.0.1")
+    message["kwargs"]["token"] = "secret"
+    assert processor._authorize_admin(message, "10.0.0.1") == {"duration": 1}
+
+
+@pytest.mark.parametrize("server_kwargs", [{"slow_threshold": 0.0}])
+def test_slow_request_log(
+    proxy_server, proxy_resource, resource_name, query_string, caplog
+):
+    open_resource(proxy_resource, resource_name)
+    message = create_message("query", "getattr", args=(query_string,))
+    with caplog.at_level(logging.WARNING, logger="pyvisa_proxy.slowlog"):
+        send_command(proxy_resource, message)
+        deadline = time.monotonic() + 5
+        while len(caplog.records) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    entry = caplog.records[-1].getMessage()
+    assert f"on {resource_name}: getattr query(args=tuple(str[" in entry
+    assert "execute=" in entry
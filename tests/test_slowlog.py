@@ -0,0 +1,40 @@
+import logging
+
+from pyvisa_proxy.slowlog import SlowRequestLog, describe, describe_request
+
+
+def test_describe():
+    assert describe(b"x" * 100) == "bytes[100]"
+    assert describe(("?IDN", 1, None)) == "tuple(str[4], 1, None)"
+    assert describe(list(range(10))) == "list[10]"
+    assert describe({"delay": 0.5}) == "dict(delay=0.5)"
+    assert describe_request(
+        {"action": "getattr", "name": "write_raw", "args": (b"x" * 9,)}
+    ) == ("getattr write_raw(args=tuple(bytes[9]), kwargs=None, value=None)")
+
+
+def test_thresholds():
+    log = SlowRequestLog(1.0, {"GPIB*": 5.0})
+    assert log.enabled
+    assert log.threshold_for("GPIB0::1::INSTR") == 5.0
+    assert log.threshold_for("ASRL1::INSTR") == 1.0
+    assert not SlowRequestLog().enabled
+    assert SlowRequestLog(None, {"GPIB*": 5.0}).threshold_for("ASRL") is None
+
+
+def test_observe(caplog):
+    log = SlowRequestLog(0.1, rate=2)
+    job_data = {"action": "getattr", "name": "query", "args": ("?IDN",)}
+    with caplog.at_level(logging.WARNING, logger="pyvisa_proxy.slowlog"):
+        assert not log.observe(0.05, "client", "ASRL1", job_data, 10, 20)
+        assert log.observe(
+            0.2, "client", "ASRL1", job_data, 10, 20, [("execute", 0, 0.2)]
+        )
+        assert log.observe(0.2, "client", "ASRL1", job_data, 10, 20)
+        # Rate limit reached
+        assert not log.observe(0.2, "client", "ASRL1", job_data, 10, 20)
+    assert log.suppressed == 1
+    assert len(caplog.records) == 2
+    message = caplog.records[0].getMessage()
+    assert "200.0 ms from client on ASRL1" in message
+    assert "execute=200.00ms" in message
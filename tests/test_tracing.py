@@ -0,0 +1,45 @@
+import pytest
+
+from pyvisa_proxy.tracing import (
+    RequestTrace,
+    add_trace_hook,
+    publish,
+    remove_trace_hook,
+    trace,
+    tracing_active,
+)
+
+
+def test_request_trace():
+    request_trace = RequestTrace(10.0)
+    request_trace.span("decode", 10.5, 11.0)
+    assert request_trace.spans == [("decode", 0.5, 1.0)]
+
+
+def test_publish_centers_server_phases():
+    records = []
+    add_trace_hook(records.append)
+    try:
+        assert tracing_active()
+        publish("query", "getattr", (0.0, 1.0, 5.0, 6.0), [("execute", 0, 2)])
+    finally:
+        remove_trace_hook(records.append)
+    assert not tracing_active()
+    (record,) = records
+    assert record["round_trip"] == 4.0
+    # 1 s network latency in each direction
+    assert record["server"] == [("execute", 2.0, 4.0)]
+
+
+def test_trace_context():
+    with trace() as tracer:
+        assert tracing_active()
+        publish(None, "list_resources", (0.0, 0.1, 0.2, 0.3), [])
+    assert not tracing_active()
+    events = tracer.chrome_trace()["traceEvents"]
+    assert [event["name"] for event in events] == [
+        "encode+send",
+        "wait",
+        "decode",
+    ]
+    assert events[1]["dur"] == pytest.approx(0.1e6)